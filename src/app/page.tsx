@@ -18,6 +18,29 @@ interface SimilarData {
   matching_results: Song[];
 }
 
+// Background ingest job returned by the dataset upload endpoints
+interface IngestJob {
+  id: string;
+  status: "queued" | "running" | "done" | "failed";
+  stage: string | null;
+  percent: number;
+  result: unknown;
+  error: string | null;
+}
+
+// Uploads only queue the ingest (202), so poll the job until it is done or failed
+const waitForJob = async (job: IngestJob): Promise<IngestJob> => {
+  while (job.status !== "done" && job.status !== "failed") {
+    await new Promise((resolve) => setTimeout(resolve, 500));
+    const response = await fetch(`http://127.0.0.1:8000/jobs/${job.id}`);
+    if (!response.ok) {
+      return { ...job, status: "failed", error: "Upload job not found" };
+    }
+    job = await response.json();
+  }
+  return job;
+};
+
 const HomePage: React.FC = () => {
   // Core view and file states
   const [currentView, setCurrentView] = useState<"audio" | "image" | null>(
@@ -117,10 +140,15 @@ const HomePage: React.FC = () => {
         );
 
         if (response.ok) {
-          const result = await response.json();
-          console.log("Dataset uploaded successfully:", result);
-          setAudioZip(file);
-          setShowAudioPlayer(false);
+          const job = await waitForJob((await response.json()).job);
+          if (job.status === "done") {
+            console.log("Dataset uploaded successfully:", job.result);
+            setAudioZip(file);
+            setShowAudioPlayer(false);
+          } else {
+            console.error("Error loading dataset:", job.error);
+            alert(`Failed to load audio dataset: ${job.error}`);
+          }
         } else {
           const error = await response.json();
           console.error("Error uploading dataset:", error);
@@ -152,9 +180,14 @@ const HomePage: React.FC = () => {
         );
 
         if (response.ok) {
-          const result = await response.json();
-          console.log("Dataset uploaded successfully:", result);
-          setImageZip(file);
+          const job = await waitForJob((await response.json()).job);
+          if (job.status === "done") {
+            console.log("Dataset uploaded successfully:", job.result);
+            setImageZip(file);
+          } else {
+            console.error("Error loading dataset:", job.error);
+            alert(`Failed to load image dataset: ${job.error}`);
+          }
         } else {
           const error = await response.json();
           console.error("Error uploading dataset:", error);
@@ -189,10 +222,15 @@ const HomePage: React.FC = () => {
         );
 
         if (response.ok) {
-          const result = await response.json();
-          console.log("Dataset uploaded successfully:", result);
-          setAudioZip(file);
-          setShowAudioPlayer(false);
+          const job = await waitForJob((await response.json()).job);
+          if (job.status === "done") {
+            console.log("Dataset uploaded successfully:", job.result);
+            setAudioZip(file);
+            setShowAudioPlayer(false);
+          } else {
+            console.error("Error loading dataset:", job.error);
+            alert(`Failed to load audio dataset: ${job.error}`);
+          }
         } else {
           const error = await response.json();
           console.error("Error uploading dataset:", error);
@@ -226,9 +264,14 @@ const HomePage: React.FC = () => {
         );
 
         if (response.ok) {
-          const result = await response.json();
-          console.log("Dataset uploaded successfully:", result);
-          setImageZip(file);
+          const job = await waitForJob((await response.json()).job);
+          if (job.status === "done") {
+            console.log("Dataset uploaded successfully:", job.result);
+            setImageZip(file);
+          } else {
+            console.error("Error loading dataset:", job.error);
+            alert(`Failed to load image dataset: ${job.error}`);
+          }
         } else {
           const error = await response.json();
           console.error("Error uploading dataset:", error);
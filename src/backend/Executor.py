@@ -0,0 +1,79 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Callable, Dict
+
+
+class ExecutorSaturated(Exception):
+    """Raised when every worker is busy and the wait queue is full"""
+
+
+class SearchExecutor:
+    """Runs CPU-bound search work off the event loop.
+
+    Searches run on a thread pool, since they read the processors' in-memory
+    index (NumPy and OpenCV release the GIL for the heavy parts). Feature
+    extraction from query bytes goes to a process pool when kind is "process",
+    for pure-Python work such as MIDI parsing; it must be a module-level function.
+
+    At most max_workers requests run at once and max_queue more may wait;
+    admit() raises ExecutorSaturated beyond that so latency stays bounded.
+    """
+
+    KINDS = ("thread", "process")
+
+    def __init__(self, kind: str = "thread", max_workers: int = None, max_queue: int = 64):
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown executor kind '{kind}', expected one of {self.KINDS}")
+        self.kind = kind
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.threads = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="search")
+        self.processes = None
+        # Only touched from the event loop thread, so plain counters are safe
+        self.active = 0
+        self.completed = 0
+        self.rejected = 0
+
+    @asynccontextmanager
+    async def admit(self):
+        """Reserve a slot for one request, or raise ExecutorSaturated"""
+        if self.active >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise ExecutorSaturated("Search capacity exhausted, retry shortly")
+        self.active += 1
+        try:
+            yield self
+        finally:
+            self.active -= 1
+            self.completed += 1
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        """Run fn on the thread pool"""
+        return await asyncio.get_running_loop().run_in_executor(self.threads, partial(fn, *args, **kwargs))
+
+    async def extract(self, fn: Callable, *args):
+        """Run a feature-extraction function on the process pool, or threads in thread mode"""
+        if self.kind != "process":
+            return await self.run(fn, *args)
+        if self.processes is None:
+            self.processes = ProcessPoolExecutor(max_workers=self.max_workers)
+        return await asyncio.get_running_loop().run_in_executor(self.processes, fn, *args)
+
+    def stats(self) -> Dict:
+        return {
+            'kind': self.kind,
+            'max_workers': self.max_workers,
+            'max_queue': self.max_queue,
+            'active': self.active,
+            'waiting': max(0, self.active - self.max_workers),
+            'completed': self.completed,
+            'rejected': self.rejected,
+        }
+
+    def shutdown(self):
+        self.threads.shutdown(wait=False, cancel_futures=True)
+        if self.processes is not None:
+            self.processes.shutdown(wait=False, cancel_futures=True)
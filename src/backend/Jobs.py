@@ -0,0 +1,119 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+
+class Job:
+    """State of one background ingest: current stage, progress and per-stage timings.
+
+    Stages are the ordered names the job will report; percent assumes each stage
+    takes an equal share of the work.
+    """
+
+    def __init__(self, kind: str, stages: List[str]):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.stages = stages
+        self.status = "queued"
+        self.stage = None
+        self.stage_fraction = 0.0
+        self.stage_started = None
+        self.timings = {}
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.lock = threading.Lock()
+
+    def progress(self, stage: str, fraction: float = 0.0):
+        """Report progress within a stage; moving to a new stage closes the previous one"""
+        with self.lock:
+            now = time.time()
+            if stage != self.stage:
+                if self.stage is not None:
+                    self.timings[self.stage] = now - self.stage_started
+                self.stage, self.stage_started = stage, now
+            self.stage_fraction = min(max(fraction, 0.0), 1.0)
+
+    @property
+    def percent(self) -> float:
+        if self.status == "done":
+            return 100.0
+        if self.stage not in self.stages:
+            return 0.0
+        return 100.0 * (self.stages.index(self.stage) + self.stage_fraction) / len(self.stages)
+
+    def finish(self, status: str, result=None, error: str = None):
+        with self.lock:
+            self.finished_at = time.time()
+            if self.stage is not None:
+                self.timings[self.stage] = self.finished_at - self.stage_started
+            self.status, self.result, self.error = status, result, error
+
+    def to_dict(self) -> Dict:
+        with self.lock:
+            now = self.finished_at or time.time()
+            return {
+                'id': self.id,
+                'kind': self.kind,
+                'status': self.status,
+                'stage': self.stage,
+                'stage_percent': 100.0 * self.stage_fraction,
+                'percent': self.percent,
+                'timings': dict(self.timings),
+                'queued_time': (self.started_at or now) - self.created_at,
+                'elapsed_time': now - self.started_at if self.started_at else 0.0,
+                'result': self.result,
+                'error': self.error,
+            }
+
+
+class JobManager:
+    """Runs ingest jobs off the event loop.
+
+    Each queue (e.g. "image", "audio") has its own single worker thread, so jobs
+    touching the same processor run one at a time while different processors
+    ingest in parallel. Only the most recent max_jobs jobs are remembered.
+    """
+
+    def __init__(self, max_jobs: int = 100):
+        self.max_jobs = max_jobs
+        self.jobs = OrderedDict()
+        self.executors = {}
+        self.lock = threading.Lock()
+
+    def submit(self, queue: str, kind: str, stages: List[str], fn: Callable, *args, **kwargs) -> Job:
+        """Queue fn(*args, progress=job.progress, **kwargs); its return value becomes the job result"""
+        job = Job(kind, stages)
+        with self.lock:
+            self.jobs[job.id] = job
+            finished = [job_id for job_id, old in self.jobs.items() if old.finished_at is not None]
+            for job_id in finished[:max(0, len(self.jobs) - self.max_jobs)]:
+                del self.jobs[job_id]
+            if queue not in self.executors:
+                self.executors[queue] = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{queue}-ingest")
+            executor = self.executors[queue]
+        executor.submit(self.run, job, fn, args, kwargs)
+        return job
+
+    def run(self, job: Job, fn: Callable, args, kwargs):
+        job.started_at = time.time()
+        job.status = "running"
+        try:
+            result = fn(*args, progress=job.progress, **kwargs)
+        except Exception as e:
+            job.finish("failed", error=str(e))
+        else:
+            job.finish("done", result=result)
+
+    def get(self, job_id: str) -> Job:
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def shutdown(self):
+        for executor in self.executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
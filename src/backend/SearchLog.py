@@ -0,0 +1,43 @@
+import json
+import logging
+import random
+from typing import Callable, Iterable, Union
+from rich.console import Console
+
+
+class SearchLogger:
+    """Leveled, sampled structured logging for the search hot paths.
+
+    Events go to the "search.<name>" logger as one JSON object per line. The
+    default level is WARNING, so per-query summaries (INFO) are opt-in and
+    per-row detail such as result tables (DEBUG) is never built unless asked
+    for. sample_rate keeps only that fraction of sampled events.
+    """
+
+    def __init__(self, name: str, level: Union[int, str] = logging.WARNING, sample_rate: float = 1.0):
+        self.logger = logging.getLogger(f"search.{name}")
+        self.logger.setLevel(level.upper() if isinstance(level, str) else level)
+        self.sample_rate = sample_rate
+        self.console = Console()
+
+    def enabled(self, level: int) -> bool:
+        return self.logger.isEnabledFor(level)
+
+    def event(self, name: str, level: int = logging.INFO, sampled: bool = True, **fields) -> None:
+        """Log a structured event if its level is enabled and it survives sampling"""
+        if not self.logger.isEnabledFor(level):
+            return
+        if sampled and self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        self.logger.log(level, json.dumps({'event': name, **fields}, default=str))
+
+    def detail(self, render: Callable[[], Iterable]) -> None:
+        """Build and print result tables only at DEBUG.
+
+        Rendering tables costs more than the search itself on large catalogs,
+        so render is only called when DEBUG is enabled; it returns the rich
+        renderables to print.
+        """
+        if self.logger.isEnabledFor(logging.DEBUG):
+            for renderable in render():
+                self.console.print(renderable)
@@ -0,0 +1,47 @@
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+
+class StageTimer:
+    """Wall-clock time per named stage of one request or ingest.
+
+    Stages are timed either as blocks (with timer.stage("decode"): ...) or as a
+    sequence of marks, where mark(name) closes the running stage and opens the
+    next. Repeated stages accumulate.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.current = None
+        self.current_start = None
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def mark(self, name: str) -> None:
+        """Start stage name, ending the previous marked stage"""
+        if name == self.current:
+            return
+        self.stop()
+        self.current, self.current_start = name, time.perf_counter()
+
+    def stop(self) -> None:
+        if self.current is not None:
+            self.add(self.current, time.perf_counter() - self.current_start)
+            self.current = None
+
+    def as_dict(self) -> Dict[str, float]:
+        return dict(self.stages)
+
+    def server_timing(self) -> str:
+        """Stages as a Server-Timing header value (durations in milliseconds)"""
+        return ", ".join(f"{name};dur={seconds * 1000:.3f}" for name, seconds in self.stages.items())
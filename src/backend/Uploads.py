@@ -0,0 +1,218 @@
+import hashlib
+import os
+import tempfile
+import zipfile
+from pathlib import Path
+from typing import Dict
+from fastapi import Request
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+from starlette.concurrency import run_in_threadpool
+
+
+class UploadRejected(Exception):
+    """An upload that breaks a size or archive limit; carries the HTTP status to answer with"""
+
+    def __init__(self, message: str, status_code: int = 413):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class SpooledUpload:
+    """An upload written to disk, with its sha256 and size"""
+
+    def __init__(self, path: Path, sha256: str, size: int, filename: str = None):
+        self.path = path
+        self.sha256 = sha256
+        self.size = size
+        self.filename = filename
+        self.members = None
+
+    @property
+    def name(self) -> str:
+        return self.path.name
+
+    def unlink(self):
+        self.path.unlink(missing_ok=True)
+
+    def summary(self) -> dict:
+        return {'sha256': self.sha256, 'bytes': self.size, 'members': self.members}
+
+
+class MultipartSpool:
+    """python-multipart callbacks that write the wanted file parts of a body to
+    temp files, hashing each part as its bytes are written.
+
+    suffixes maps the form field names to keep to their temp file suffix; other
+    fields, and file fields sent without a file, are skipped.
+    """
+
+    def __init__(self, boundary: bytes, upload_dir: Path, suffixes: Dict[str, str]):
+        self.upload_dir = upload_dir
+        self.suffixes = suffixes
+        self.uploads = {}
+        self.header_field = b""
+        self.header_value = b""
+        self.headers = {}
+        # The file part being received, if it is one to keep
+        self.part = None
+        self.part_name = None
+        self.part_file = None
+        self.part_digest = None
+        self.parser = MultipartParser(boundary, {
+            'on_part_begin': self.on_part_begin,
+            'on_header_field': self.on_header_field,
+            'on_header_value': self.on_header_value,
+            'on_header_end': self.on_header_end,
+            'on_headers_finished': self.on_headers_finished,
+            'on_part_data': self.on_part_data,
+            'on_part_end': self.on_part_end,
+        })
+
+    def write(self, data: bytes):
+        self.parser.write(data)
+
+    def finalize(self):
+        self.parser.finalize()
+
+    def on_part_begin(self):
+        self.headers = {}
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self.header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self.header_value += data[start:end]
+
+    def on_header_end(self):
+        self.headers[self.header_field.lower()] = self.header_value
+        self.header_field = b""
+        self.header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self.headers.get(b"content-disposition", b""))
+        name = options.get(b"name", b"").decode("latin-1")
+        filename = options.get(b"filename")
+        if name not in self.suffixes or name in self.uploads or not filename:
+            return
+        fd, path = tempfile.mkstemp(prefix="upload_", suffix=self.suffixes[name], dir=self.upload_dir)
+        self.part = SpooledUpload(Path(path), None, 0, filename.decode("utf-8", "replace"))
+        self.part_name = name
+        self.part_file = os.fdopen(fd, 'wb')
+        self.part_digest = hashlib.sha256()
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self.part is not None:
+            chunk = data[start:end]
+            self.part_file.write(chunk)
+            self.part_digest.update(chunk)
+            self.part.size += len(chunk)
+
+    def on_part_end(self):
+        if self.part is not None:
+            self.part_file.close()
+            self.part.sha256 = self.part_digest.hexdigest()
+            self.uploads[self.part_name] = self.part
+            self.part = None
+
+    def discard(self):
+        """Remove every temp file written so far, including a part still being received"""
+        if self.part is not None:
+            self.part_file.close()
+            self.part.unlink()
+            self.part = None
+        for upload in self.uploads.values():
+            upload.unlink()
+
+
+class UploadSpooler:
+    """Writes uploads to temp files in upload_dir while the request body arrives.
+
+    The multipart body is parsed straight from the request stream instead of
+    letting Starlette spool it first, so each file is written to disk once and
+    hashed on the way. max_bytes bounds the request body: a Content-Length above
+    it is rejected before anything is read, and a body that streams past it is
+    cut off as soon as it does. Zip archives are then checked against
+    member-count and uncompressed-size limits from their central directory,
+    before anything is extracted.
+    """
+
+    def __init__(self, upload_dir, max_bytes: int = None, max_members: int = None,
+                 max_uncompressed_bytes: int = None, chunk_size: int = 1 << 20):
+        self.upload_dir = Path(upload_dir)
+        self.upload_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_members = max_members
+        self.max_uncompressed_bytes = max_uncompressed_bytes
+        self.chunk_size = chunk_size
+
+    async def receive(self, request: Request, suffixes: Dict[str, str]) -> Dict[str, SpooledUpload]:
+        """Stream a multipart request into temp files, one per file field named in
+        suffixes (field name -> file suffix), returning the received ones by name.
+
+        Incoming chunks are batched up to chunk_size and parsed and written on the
+        thread pool, so disk writes never block the event loop.
+        """
+        content_type, params = parse_options_header(request.headers.get("content-type", ""))
+        if content_type != b"multipart/form-data" or b"boundary" not in params:
+            raise UploadRejected("Expected a multipart/form-data upload", status_code=400)
+        length = request.headers.get("content-length", "")
+        if self.max_bytes is not None and length.isdigit() and int(length) > self.max_bytes:
+            raise UploadRejected(f"Upload exceeds the {self.max_bytes} byte limit")
+
+        spool = MultipartSpool(params[b"boundary"], self.upload_dir, suffixes)
+        received = 0
+        pending = []
+        pending_size = 0
+        try:
+            async for chunk in request.stream():
+                received += len(chunk)
+                if self.max_bytes is not None and received > self.max_bytes:
+                    raise UploadRejected(f"Upload exceeds the {self.max_bytes} byte limit")
+                pending.append(chunk)
+                pending_size += len(chunk)
+                if pending_size >= self.chunk_size:
+                    await run_in_threadpool(spool.write, b"".join(pending))
+                    pending, pending_size = [], 0
+            await run_in_threadpool(spool.write, b"".join(pending))
+            spool.finalize()
+            if spool.part is not None:
+                raise UploadRejected("Upload ended in the middle of a file", status_code=400)
+        except MultipartParseError:
+            spool.discard()
+            raise UploadRejected("Invalid multipart body", status_code=400) from None
+        except BaseException:
+            spool.discard()
+            raise
+        return spool.uploads
+
+    def check_archive(self, upload: SpooledUpload) -> SpooledUpload:
+        """Validate a spooled zip against the member and uncompressed-size limits"""
+        try:
+            with zipfile.ZipFile(upload.path, 'r') as zip_ref:
+                members = [info for info in zip_ref.infolist() if not info.is_dir()]
+        except zipfile.BadZipFile:
+            raise UploadRejected("Uploaded file is not a valid zip archive", status_code=400)
+
+        if self.max_members is not None and len(members) > self.max_members:
+            raise UploadRejected(f"Archive has {len(members)} files, the limit is {self.max_members}")
+        uncompressed = sum(info.file_size for info in members)
+        if self.max_uncompressed_bytes is not None and uncompressed > self.max_uncompressed_bytes:
+            raise UploadRejected(f"Archive expands to {uncompressed} bytes, the limit is {self.max_uncompressed_bytes}")
+        upload.members = len(members)
+        return upload
+
+    async def save_dataset(self, request: Request):
+        """Receive a dataset zip (checked) and its optional mapper from the "file"
+        and "mapper_file" fields of a multipart request, returning (zip, mapper)"""
+        uploads = await self.receive(request, {'file': ".zip", 'mapper_file': ".json"})
+        archive, mapper = uploads.get('file'), uploads.get('mapper_file')
+        try:
+            if archive is None:
+                raise UploadRejected("A dataset zip is required in the \"file\" field", status_code=400)
+            self.check_archive(archive)
+        except BaseException:
+            for upload in uploads.values():
+                upload.unlink()
+            raise
+        return archive, mapper
@@ -2,6 +2,7 @@
 # main.py
 from fastapi import FastAPI, UploadFile, File
 import os
+import tempfile
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
@@ -14,8 +15,13 @@ from pathlib import Path
 import time
 from rich.console import Console
 from rich.table import Table
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
 import logging
+from SearchLog import SearchLogger
+from StageTimer import StageTimer
+from audio.MidiFeatures import FEATURE_LENGTH, sequence_features
+from audio.MidiScanner import scan_notes
+from audio.MidiIngest import extract_features
 
 # Initialize Rich console for beautiful terminal output
 console = Console()
@@ -23,22 +29,80 @@ console = Console()
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# Dataset songs are matched on channel 1 (indexed as 0)
+DATASET_CHANNEL = 0
+
+def midi_bytes_features(data: bytes) -> np.ndarray:
+    """Features of an in-memory MIDI file; module-level so it can run in a process pool"""
+    return sequence_features(*scan_notes(data).sequence())
+
+
+def timed_midi_bytes_features(data: bytes):
+    """midi_bytes_features plus the seconds spent in its "parse" and "features" stages"""
+    timer = StageTimer()
+    with timer.stage("parse"):
+        notes = scan_notes(data)
+    with timer.stage("features"):
+        features = sequence_features(*notes.sequence())
+    return features, timer.as_dict()
+
+
+class AudioIndex:
+    """Immutable snapshot of the audio dataset: feature matrix and matching metadata.
+
+    AudioProcessor swaps whole snapshots, so a search that reads processor.index
+    once never pairs features from one dataset with metadata from another.
+
+    Rows are kept L2-normalized in float32 alongside their norms, so cosine
+    similarity against every song is a single matrix-vector product. All-zero
+    rows (songs without channel-1 notes) stay zero and score 0.
+    """
+
+    __slots__ = ('unitFeatures', 'norms', 'metadata')
+
+    def __init__(self, features: np.ndarray, metadata: List[Dict]):
+        features = np.asarray(features, dtype=np.float32).reshape(-1, FEATURE_LENGTH)
+        norms = np.linalg.norm(features, axis=1)
+        unitFeatures = np.divide(features, norms[:, None], out=np.zeros_like(features), where=norms[:, None] > 0)
+        object.__setattr__(self, 'unitFeatures', unitFeatures)
+        object.__setattr__(self, 'norms', norms)
+        object.__setattr__(self, 'metadata', metadata)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("AudioIndex snapshots are immutable; install a new one instead")
+
+    def __len__(self) -> int:
+        return len(self.metadata)
+
+    @property
+    def features(self) -> np.ndarray:
+        """Feature rows at their original scale"""
+        return self.unitFeatures * self.norms[:, None]
+
+    def cosine_similarities(self, queryFeatures: np.ndarray) -> np.ndarray:
+        """Cosine similarity (%) of a query against every song, 0 for a zero query"""
+        queryNorm = np.linalg.norm(queryFeatures)
+        if queryNorm == 0:
+            return np.zeros(len(self), dtype=np.float32)
+        return self.unitFeatures @ (np.asarray(queryFeatures, dtype=np.float32) / np.float32(queryNorm)) * 100
+
+
 class AudioDatasetLoader:
-    def __init__(self, temp_extracted_path, test_dir: str = "../../test"):
+    def __init__(self, temp_extracted_path, test_dir: str = "../../test", clean: bool = True):
         """Initialize the dataset loader with directory paths and cleanup"""
         self.test_dir = Path(test_dir)
         self.temp_dir = Path(temp_extracted_path)
         self.audios_dir = self.temp_dir / "audio"
         self.mapper_data = None
         
-        # Cleanup on initialization
-        if self.temp_dir.exists():
+        # Cleanup on initialization (skipped on warm start)
+        if clean and self.temp_dir.exists():
             try:
                 shutil.rmtree(self.temp_dir)
             except Exception as e:
                 console.print(f"[red]Warning: Could not clean up existing temp directory: {e}")
         
-        self.temp_dir.mkdir(exist_ok=True)
+        self.temp_dir.mkdir(parents=True, exist_ok=True)
         self.audios_dir.mkdir(exist_ok=True)
     
     def extract_zip(self, zipPath: str, extractTo: Path) -> None:
@@ -91,8 +155,31 @@ class AudioDatasetLoader:
             console.print(f"[red]Error processing MIDI file {inputPath}: {e}")
             raise
     
+    def channel1_file(self, audio: str) -> Path:
+        """Channel-1 export of a dataset song, written on first request.
+
+        Ingest extracts features straight from the original file, so exports only
+        exist for songs someone asked for. An export older than its source (the
+        song was re-uploaded) is rewritten.
+        """
+        midiPath = self.audios_dir / audio
+        channel1Path = self.audios_dir / f"{midiPath.stem}_channel1.mid"
+        if channel1Path.exists() and channel1Path.stat().st_mtime >= midiPath.stat().st_mtime:
+            return channel1Path
+        
+        # Write aside and rename, so concurrent requests never see a partial file
+        fd, tmpPath = tempfile.mkstemp(suffix=".part", dir=self.audios_dir)
+        os.close(fd)
+        try:
+            self.extract_channel1(midiPath, Path(tmpPath))
+            os.replace(tmpPath, channel1Path)
+        finally:
+            if os.path.exists(tmpPath):
+                os.remove(tmpPath)
+        return channel1Path
+    
     def setup_dataset(self, zip_path, mapper_path: None) -> List[Dict]:
-        """Set up the dataset by extracting files and processing MIDI files"""
+        """Set up the dataset by extracting files; metadata paths point at the originals"""
         startTime = time.time()
         console.print("[bold blue]Setting up dataset...")
         console.print("masuk ke sini")
@@ -106,13 +193,9 @@ class AudioDatasetLoader:
             for song in self.mapperData["songs"]:
                 midiPath = self.audios_dir / song["audio"]
                 if midiPath.exists():
-                    # Create output path for channel 1 extraction
-                    channel1Path = self.audios_dir / f"{midiPath.stem}_channel1.mid"
-                    self.extract_channel1(midiPath, channel1Path)
-                    
                     # Create metadata with only required fields and default values
                     metadata = {
-                        "path": str(channel1Path),
+                        "path": str(midiPath),
                         "song": song["song"],
                         "album": song["album"],
                         "singer": song.get("singer", "-"),
@@ -126,12 +209,12 @@ class AudioDatasetLoader:
         else:
             for audio in os.listdir(self.audios_dir):
                 midiPath = self.audios_dir / audio
+                # Skip channel-1 exports and partial writes left beside the songs
+                if audio.endswith("_channel1.mid") or not audio.lower().endswith(('.mid', '.midi')):
+                    continue
                 if midiPath.exists():
-                    channel1Path = self.audios_dir / f"{audio}_channel1.mid"
-                    self.extract_channel1(midiPath, channel1Path)
-                    
                     metadata = {
-                        "path": str(channel1Path),
+                        "path": str(midiPath),
                         "song": audio,
                         "album": "-",
                         "singer": "-",
@@ -153,64 +236,34 @@ class AudioDatasetLoader:
             shutil.rmtree(self.temp_dir)
 
 class AudioProcessor:
-    def __init__(self, temp_extracted_path,similarityThreshold: float = 60.0):
+    def __init__(self, temp_extracted_path,similarityThreshold: float = 60.0, cleanTemp: bool = True,
+                 logLevel: str = "WARNING", logSampleRate: float = 1.0, numWorkers: int = None,
+                 chunkSize: int = 64):
         """Initialize the audio processor with configuration parameters"""
         self.similarityThreshold = similarityThreshold
-        self.dataset_features = None
-        self.audioMetadata = []
-        self.dataset_loader = AudioDatasetLoader(temp_extracted_path)
+        # Ingest parses files in chunks of chunkSize on numWorkers processes (default: all cores)
+        self.numWorkers = numWorkers
+        self.chunkSize = chunkSize
+        self.searchLog = SearchLogger("audio", logLevel, logSampleRate)
+        self.index = None
+        self.dataset_loader = AudioDatasetLoader(temp_extracted_path, clean=cleanTemp)
         self.loadTime = 0
+        self.loadStages = {}
+        self.loadErrors = []
         self.processingTime = 0
 
+    @property
+    def dataset_features(self) -> np.ndarray:
+        return None if self.index is None else self.index.features
+
+    @property
+    def audioMetadata(self) -> List[Dict]:
+        return [] if self.index is None else self.index.metadata
+
     def process_midi_file(self, midiPath: str) -> np.ndarray:
         """Process MIDI file to extract features based on the reference implementation"""
-        midiData = mido.MidiFile(midiPath)
-        
-        # Extract features as described in the reference images
-        # 1. Absolute Tone Based (ATB)
-        noteFrequencies = np.zeros(128)  # MIDI notes range from 0 to 127
-        
-        for track in midiData.tracks:
-            for msg in track:
-                if msg.type == 'note_on' and msg.velocity > 0:
-                    noteFrequencies[msg.note] += 1
-        
-        # Normalize ATB histogram
-        atbFeatures = noteFrequencies / np.sum(noteFrequencies) if np.sum(noteFrequencies) > 0 else noteFrequencies
-        
-        # 2. Relative Tone Based (RTB)
-        rtbFeatures = np.zeros(255)  # -127 to +127 range
-        previousNote = None
-        
-        for track in midiData.tracks:
-            for msg in track:
-                if msg.type == 'note_on' and msg.velocity > 0:
-                    if previousNote is not None:
-                        interval = msg.note - previousNote
-                        rtbFeatures[interval + 127] += 1
-                    previousNote = msg.note
-        
-        # Normalize RTB histogram
-        rtbFeatures = rtbFeatures / np.sum(rtbFeatures) if np.sum(rtbFeatures) > 0 else rtbFeatures
-        
-        # 3. First Tone Based (FTB)
-        ftbFeatures = np.zeros(255)  # -127 to +127 range
-        
-        for track in midiData.tracks:
-            firstNote = None
-            for msg in track:
-                if msg.type == 'note_on' and msg.velocity > 0:
-                    if firstNote is None:
-                        firstNote = msg.note
-                    else:
-                        interval = msg.note - firstNote
-                        ftbFeatures[interval + 127] += 1
-        
-        # Normalize FTB histogram
-        ftbFeatures = ftbFeatures / np.sum(ftbFeatures) if np.sum(ftbFeatures) > 0 else ftbFeatures
-        # logger.info("nyampe sini")
-        # Combine all features
-        return np.concatenate([atbFeatures, rtbFeatures, ftbFeatures])
+        with open(midiPath, 'rb') as f:
+            return midi_bytes_features(f.read())
 
     def calculate_similarity(self, features1: np.ndarray, features2: np.ndarray) -> float:
         """Calculate cosine similarity between two feature vectors"""
@@ -230,8 +283,8 @@ class AudioProcessor:
         table.add_column("Metric", style="cyan")
         table.add_column("Value", style="green")
         
-        table.add_row("Processing Time", f"{self.processing_time:.2f} seconds")
-        table.add_row("Dataset Load Time", f"{self.load_time:.2f} seconds")
+        table.add_row("Processing Time", f"{results['processing_metrics']['processing_time']:.2f} seconds")
+        table.add_row("Dataset Load Time", f"{results['processing_metrics']['load_time']:.2f} seconds")
         table.add_row("Matches Found", str(results['matches_found']))
         
         return table
@@ -257,81 +310,101 @@ class AudioProcessor:
         
         return table
     
-    def load_dataset(self, temp_zip, mapper_path: None):
-        """Load and process the dataset with timing"""
+    def load_dataset(self, temp_zip, mapper_path: None, progress: Callable = None):
+        """Load and process the dataset with timing.
+
+        progress(stage, fraction) is called as ingest advances. Features are built
+        aside and swapped in at the end, so searches use the previous dataset until then.
+        Each file is parsed once, with the channel-1 filter applied while scanning,
+        on a process pool of numWorkers. Songs that fail to parse are left out and
+        listed in loadErrors. Time spent extracting, parsing and computing features
+        (summed over workers) ends up in loadStages.
+        """
         startTime = time.time()
+        timer = StageTimer()
         
         with console.status("[bold green]Loading dataset...") as status:
-            self.audioMetadata = self.dataset_loader.setup_dataset(temp_zip, mapper_path)
-            processedFeatures = []
-            
-            for idx, metadata in enumerate(self.audioMetadata):
-                features = self.process_midi_file(metadata["path"])
-                processedFeatures.append(features)
-                console.print(f"[cyan]Processing MIDI file {idx+1}/{len(self.audioMetadata)}")
+            if progress:
+                progress("extract", 0.0)
+            with timer.stage("extract"):
+                audioMetadata = self.dataset_loader.setup_dataset(temp_zip, mapper_path)
+            if progress:
+                progress("parse", 0.0)
+            datasetFeatures, loaded, errors, workerStages = extract_features(
+                [metadata["path"] for metadata in audioMetadata], DATASET_CHANNEL,
+                self.numWorkers, self.chunkSize,
+                progress=(lambda done, total: progress("parse", done / total)) if progress else None
+            )
+            for name, seconds in workerStages.items():
+                timer.add(name, seconds)
             
-            self.dataset_features = np.array(processedFeatures)
-            logger.info("ini dataset features bro: ", self.dataset_features)
+            loadErrors = [{"audio": audioMetadata[idx]["audio"], "error": message} for idx, message in errors.items()]
+            for error in loadErrors:
+                console.print(f"[red]Warning: Could not parse MIDI file {error['audio']}: {error['error']}")
+            audioMetadata = [metadata for metadata, ok in zip(audioMetadata, loaded) if ok]
+            logger.debug("Dataset features shape: %s", datasetFeatures.shape)
+            self.index = AudioIndex(datasetFeatures, audioMetadata)
             
         
+        self.loadErrors = loadErrors
+        self.loadStages = timer.as_dict()
         self.loadTime = time.time() - startTime
-        console.print(f"[bold green]Dataset loaded and processed in {self.loadTime:.2f} seconds")
+        console.print(f"[bold green]Dataset loaded and processed {len(audioMetadata)} files in {self.loadTime:.2f} seconds")
 
-    def search_similar_audio(self, queryFeatures: np.ndarray) -> Dict:
-        """Search for similar audio files using cosine similarity"""
+    def search_similar_audio(self, queryFeatures: np.ndarray, similarityThreshold: float = None,
+                             topK: int = None, timer: StageTimer = None) -> Dict:
+        """Search for similar audio files using cosine similarity.
+
+        similarityThreshold defaults to the processor's; topK caps the matches returned.
+        The "distance" and "ranking" stages are recorded on timer.
+        """
         startTime = time.time()
-        console.print("plis bisaaa")
-        if self.dataset_features is None:
+        timer = StageTimer() if timer is None else timer
+        index = self.index
+        if index is None:
             raise ValueError("No dataset features available. Please load dataset first.")
+        similarityThreshold = self.similarityThreshold if similarityThreshold is None else similarityThreshold
+
+        # Calculate similarities against the whole dataset in one product
+        with timer.stage("distance"):
+            similarities = index.cosine_similarities(queryFeatures)
+        with timer.stage("ranking"):
+            matches = np.flatnonzero(similarities >= similarityThreshold)
+            if topK is not None and topK < len(matches):
+                # Only the topK best are kept, so partition before sorting
+                if topK == 0:
+                    matches = matches[:0]
+                else:
+                    matches = matches[np.argpartition(-similarities[matches], topK - 1)[:topK]]
+            # Highest first, ties in dataset order; dicts are only built for matches
+            matches = matches[np.lexsort((matches, -similarities[matches]))]
+            matching_results = []
+            for idx in matches:
+                metadata = index.metadata[idx]
+                matching_results.append({
+                    'song': metadata['song'],
+                    'singer': metadata['singer'],
+                    'genre': metadata['genre'],
+                    'album': metadata['album'],
+                    'audio': metadata['audio'],
+                    'similarity_percentage': float(similarities[idx])
+                })
+        processingTime = time.time() - startTime
+        self.processingTime = processingTime
         
-        console.print("dataset feature ada")
-        console.print("ini query features", queryFeatures)
-        console.print("ini features", self.dataset_features)
-
-        # Calculate similarities
-        similarities = [self.calculate_similarity(queryFeatures, features) 
-                       for features in self.dataset_features]
-        console.print("similarity udah keitung")
-        console.print("similarity: ",similarities)
-        # Process results
-        matching_results = []
-        for idx, similarity in enumerate(similarities):
-            metadata = self.audioMetadata[idx]
-            console.print(metadata)
-            result = {
-                'song': metadata['song'],
-                'singer': metadata['singer'],
-                'genre': metadata['genre'],
-                'album': metadata['album'],
-                'audio': metadata['audio'],
-                'similarity_percentage': similarity
-            }
-            
-            if similarity >= self.similarityThreshold:
-                matching_results.append(result)
-        
-        console.print("matching_results belum ke-sort")
-        # Sort results by similarity
-        matching_results.sort(key=lambda x: x['similarity_percentage'], reverse=True)
-        console.print("matching_results udah ke-sort")
-        self.processingTime = time.time() - startTime
-        
-        console.print(matching_results)
         results = {
             'matches_found': len(matching_results),
             'matching_results': matching_results,
             'processing_metrics': {
-                'processing_time': self.processingTime,
-                'load_time': self.loadTime
+                'processing_time': processingTime,
+                'load_time': self.loadTime,
+                'stages': timer.as_dict()
             }
         }
-        console.print("ini result: ", results)
-        # Print formatted results
-        # console.print("\n")
-        # console.print(self.create_results_table(results))
-        # console.print("\n")
-        # console.print(self.create_matches_table(matching_results))
-        # console.print("\n")
+        self.searchLog.event('audio_search', matches=len(matching_results), dataset=len(index),
+                             processing_time=processingTime)
+        self.searchLog.detail(lambda: (self.create_results_table(results),
+                                       self.create_matches_table(results['matching_results'])))
         
         return results
 
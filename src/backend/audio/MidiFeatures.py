@@ -0,0 +1,40 @@
+import numpy as np
+
+# Interval histograms cover -127..+127 semitones
+INTERVAL_OFFSET = 127
+INTERVAL_BINS = 255
+# ATB (128) + RTB (255) + FTB (255)
+FEATURE_LENGTH = 128 + 2 * INTERVAL_BINS
+
+
+def normalize(histogram: np.ndarray) -> np.ndarray:
+    """Histogram as float64 frequencies; all zeros stays all zeros"""
+    total = histogram.sum()
+    return histogram / total if total > 0 else histogram.astype(np.float64)
+
+
+def sequence_features(pitches: np.ndarray, tracks: np.ndarray) -> np.ndarray:
+    """ATB, RTB and FTB histograms of a note sequence, concatenated (638 values).
+
+    ATB counts pitches; RTB counts intervals between consecutive notes, across
+    track boundaries; FTB counts each note's interval to the first note of its
+    own track, the first note itself excluded.
+    """
+    pitches = np.asarray(pitches, dtype=np.int16)
+    tracks = np.asarray(tracks)
+
+    # 1. Absolute Tone Based (ATB)
+    atbFeatures = np.bincount(pitches, minlength=128)
+
+    # 2. Relative Tone Based (RTB)
+    rtbFeatures = np.bincount(np.diff(pitches) + INTERVAL_OFFSET, minlength=INTERVAL_BINS)
+
+    # 3. First Tone Based (FTB)
+    isFirst = np.ones(len(pitches), dtype=bool)
+    isFirst[1:] = tracks[1:] != tracks[:-1]
+    firstIndex = np.maximum.accumulate(np.where(isFirst, np.arange(len(pitches)), 0))
+    ftbIntervals = (pitches - pitches[firstIndex])[~isFirst]
+    ftbFeatures = np.bincount(ftbIntervals + INTERVAL_OFFSET, minlength=INTERVAL_BINS)
+
+    return np.concatenate([normalize(atbFeatures), normalize(rtbFeatures), normalize(ftbFeatures)])
+
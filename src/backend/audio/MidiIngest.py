@@ -0,0 +1,81 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, Tuple
+import numpy as np
+from audio.MidiFeatures import FEATURE_LENGTH, sequence_features
+from audio.MidiScanner import scan_notes
+from StageTimer import StageTimer
+
+
+def channel_bytes_features(data: bytes, channel: int = 0) -> np.ndarray:
+    """Features of one channel of an in-memory MIDI file, identical to those of its
+    single-track channel export; module-level so it can run in a process pool"""
+    return sequence_features(*scan_notes(data, channel).sequence(mergeTracks=True))
+
+
+def _features_chunk(start: int, paths: List[str], channel: int) -> Tuple[int, np.ndarray, Dict[int, str], Dict[str, float]]:
+    """Worker: feature rows for a run of MIDI files.
+
+    Returns (start, rows, errors, stages); a file that cannot be read or parsed
+    leaves a zero row and an entry in errors keyed by its offset in the run.
+    """
+    rows = np.zeros((len(paths), FEATURE_LENGTH), dtype=np.float32)
+    errors = {}
+    timer = StageTimer()
+    for offset, path in enumerate(paths):
+        try:
+            with timer.stage("parse"):
+                with open(path, 'rb') as f:
+                    notes = scan_notes(f.read(), channel)
+            with timer.stage("features"):
+                rows[offset] = sequence_features(*notes.sequence(mergeTracks=True))
+        except (OSError, ValueError) as e:
+            errors[offset] = str(e)
+    return start, rows, errors, timer.as_dict()
+
+
+def extract_features(paths: List[str], channel: int = 0, numWorkers: int = None, chunkSize: int = 64,
+                     progress: Callable[[int, int], None] = None) -> Tuple[np.ndarray, np.ndarray, Dict[int, str], Dict[str, float]]:
+    """Channel features of MIDI files into a preallocated float32 (N x 638) matrix.
+
+    Paths are split into chunks of chunkSize and spread over a process pool of
+    numWorkers (default: all cores); each worker returns its chunk's rows and
+    they are copied into place, so row order follows paths. A file that fails
+    is reported instead of aborting the batch. Returns (X, loaded, errors, stages)
+    where loaded flags the files that parsed, X holds only those rows, errors
+    maps failed path indices to messages and stages sums the workers' parse and
+    feature times.
+    """
+    numFiles = len(paths)
+    numWorkers = numWorkers or os.cpu_count() or 1
+    X = np.zeros((numFiles, FEATURE_LENGTH), dtype=np.float32)
+    loaded = np.ones(numFiles, dtype=bool)
+    errors = {}
+    stages = {}
+    done = 0
+
+    def collect(start, rows, chunkErrors, chunkStages):
+        nonlocal done
+        X[start:start + len(rows)] = rows
+        for offset, message in chunkErrors.items():
+            loaded[start + offset] = False
+            errors[start + offset] = message
+        for name, seconds in chunkStages.items():
+            stages[name] = stages.get(name, 0.0) + seconds
+        done += len(rows)
+        if progress:
+            progress(done, numFiles)
+
+    if numWorkers <= 1 or numFiles <= chunkSize:
+        for start in range(0, numFiles, chunkSize):
+            collect(*_features_chunk(start, paths[start:start + chunkSize], channel))
+    else:
+        with ProcessPoolExecutor(max_workers=min(numWorkers, -(-numFiles // chunkSize))) as executor:
+            futures = [
+                executor.submit(_features_chunk, start, paths[start:start + chunkSize], channel)
+                for start in range(0, numFiles, chunkSize)
+            ]
+            for future in as_completed(futures):
+                collect(*future.result())
+
+    return (X if loaded.all() else X[loaded]), loaded, dict(sorted(errors.items())), stages
@@ -0,0 +1,174 @@
+import struct
+from typing import Tuple, Union
+import numpy as np
+
+# Data bytes after the status byte, by channel message kind (high nibble)
+CHANNEL_DATA_LENGTHS = {0x80: 2, 0x90: 2, 0xA0: 2, 0xB0: 2, 0xC0: 1, 0xD0: 1, 0xE0: 2}
+# Data bytes after system common and realtime status bytes
+SYSTEM_DATA_LENGTHS = {0xF1: 1, 0xF2: 2, 0xF3: 1, 0xF6: 0, 0xF8: 0, 0xFA: 0, 0xFB: 0, 0xFC: 0, 0xFE: 0}
+
+
+class MidiNotes:
+    """Note-on and note-off events of a Standard MIDI File as parallel arrays.
+
+    One row per event in file order: absolute tick within its track, track
+    index, channel (0-based), note number, velocity and whether it is a note-on.
+    """
+
+    __slots__ = ('ticksPerBeat', 'ticks', 'tracks', 'channels', 'pitches', 'velocities', 'noteOn')
+
+    def __init__(self, ticksPerBeat: int, ticks: np.ndarray, tracks: np.ndarray, channels: np.ndarray,
+                 pitches: np.ndarray, velocities: np.ndarray, noteOn: np.ndarray):
+        self.ticksPerBeat = ticksPerBeat
+        self.ticks = ticks
+        self.tracks = tracks
+        self.channels = channels
+        self.pitches = pitches
+        self.velocities = velocities
+        self.noteOn = noteOn
+
+    def __len__(self) -> int:
+        return len(self.pitches)
+
+    @property
+    def sounding(self) -> np.ndarray:
+        """Note-ons with a non-zero velocity, the events the ATB/RTB/FTB features count"""
+        return self.noteOn & (self.velocities > 0)
+
+    def sequence(self, mergeTracks: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """(pitches, tracks) of the sounding notes, the input of sequence_features.
+
+        mergeTracks puts every note on track 0, as if the tracks had been copied
+        one after another into a single track (what the channel-1 export writes).
+        """
+        sounding = self.sounding
+        pitches = self.pitches[sounding]
+        if mergeTracks:
+            return pitches, np.zeros(len(pitches), dtype=np.int32)
+        return pitches, self.tracks[sounding]
+
+
+def scan_notes(data: Union[bytes, memoryview], channel: int = None) -> MidiNotes:
+    """Scan an SMF for note events without building a message object per event.
+
+    Only delta times and status bytes are decoded; meta, sysex and other channel
+    messages are skipped by length. Running status follows mido's rules and data
+    bytes must be 0..127 as mido requires, so the events match what
+    mido.MidiFile would yield. With channel set (0-based), notes on other
+    channels are dropped. Raises ValueError on malformed files, including data
+    bytes mido rejects and messages that run past the end of their track.
+    """
+    buffer = bytes(data)
+    if buffer[:4] != b'MThd' or len(buffer) < 14:
+        raise ValueError("Not a Standard MIDI File")
+    headerSize, = struct.unpack_from('>L', buffer, 4)
+    _, numTracks, ticksPerBeat = struct.unpack_from('>HHH', buffer, 8)
+
+    ticks, tracks, channels, pitches, velocities, noteOn = [], [], [], [], [], []
+    pos = 8 + headerSize
+    trackIndex = 0
+    try:
+        while trackIndex < numTracks and pos + 8 <= len(buffer):
+            name, size = struct.unpack_from('>4sL', buffer, pos)
+            pos += 8
+            end = pos + size
+            if name != b'MTrk':
+                pos = end
+                continue
+            if end > len(buffer):
+                raise ValueError(f"Track {trackIndex} is truncated")
+
+            tick = 0
+            status = None
+            while pos < end:
+                # Delta time (variable-length quantity)
+                byte = buffer[pos]
+                pos += 1
+                delta = byte & 0x7F
+                while byte & 0x80:
+                    byte = buffer[pos]
+                    pos += 1
+                    delta = (delta << 7) | (byte & 0x7F)
+                tick += delta
+
+                kind = buffer[pos]
+                if kind < 0x80:
+                    # Running status: this is already the first data byte
+                    if status is None:
+                        raise ValueError(f"Running status without a status byte in track {trackIndex}")
+                    kind = status
+                    if kind >= 0xF0:
+                        if kind == 0xF0 or kind == 0xF7:
+                            # mido drops the byte and reads the sysex length after it
+                            pos += 1
+                        elif SYSTEM_DATA_LENGTHS.get(kind) == 0:
+                            raise ValueError(f"Data byte after a status without data in track {trackIndex}")
+                else:
+                    pos += 1
+                    if kind != 0xFF:
+                        status = kind
+
+                if kind == 0xFF or kind == 0xF0 or kind == 0xF7:
+                    if kind == 0xFF:
+                        pos += 1  # meta type
+                    byte = buffer[pos]
+                    pos += 1
+                    length = byte & 0x7F
+                    while byte & 0x80:
+                        byte = buffer[pos]
+                        pos += 1
+                        length = (length << 7) | (byte & 0x7F)
+                    if kind != 0xFF:
+                        # Sysex payload without its framing F0/F7, as mido reads it
+                        payload = buffer[pos:pos + length]
+                        if payload[:1] == b'\xf0':
+                            payload = payload[1:]
+                        if payload[-1:] == b'\xf7':
+                            payload = payload[:-1]
+                        if payload and max(payload) > 0x7F:
+                            raise ValueError(f"Sysex data byte out of range 0..127 in track {trackIndex}")
+                    pos += length
+                elif kind >= 0xF0:
+                    if kind not in SYSTEM_DATA_LENGTHS:
+                        raise ValueError(f"Undefined status byte 0x{kind:02x} in track {trackIndex}")
+                    length = SYSTEM_DATA_LENGTHS[kind]
+                    if length and max(buffer[pos:pos + length]) > 0x7F:
+                        raise ValueError(f"Data byte out of range 0..127 in track {trackIndex}")
+                    pos += length
+                else:
+                    message = kind & 0xF0
+                    length = CHANNEL_DATA_LENGTHS[message]
+                    if message == 0x80 or message == 0x90:
+                        if channel is None or kind & 0x0F == channel:
+                            # Kept notes are range-checked in bulk below
+                            ticks.append(tick)
+                            tracks.append(trackIndex)
+                            channels.append(kind & 0x0F)
+                            pitches.append(buffer[pos])
+                            velocities.append(buffer[pos + 1])
+                            noteOn.append(message == 0x90)
+                        elif (buffer[pos] | buffer[pos + 1]) & 0x80:
+                            raise ValueError(f"Data byte out of range 0..127 in track {trackIndex}")
+                    elif (buffer[pos] | buffer[pos + length - 1]) & 0x80:
+                        raise ValueError(f"Data byte out of range 0..127 in track {trackIndex}")
+                    pos += length
+            if pos != end:
+                raise ValueError(f"Track {trackIndex} overruns its length")
+            trackIndex += 1
+    except IndexError:
+        raise ValueError(f"Track {trackIndex} is truncated") from None
+
+    pitches = np.array(pitches, dtype=np.int16)
+    velocities = np.array(velocities, dtype=np.uint8)
+    if len(pitches) and max(pitches.max(), velocities.max()) > 0x7F:
+        track = tracks[np.flatnonzero((pitches > 0x7F) | (velocities > 0x7F))[0]]
+        raise ValueError(f"Data byte out of range 0..127 in track {track}")
+    return MidiNotes(
+        ticksPerBeat,
+        np.array(ticks, dtype=np.int64),
+        np.array(tracks, dtype=np.int32),
+        np.array(channels, dtype=np.uint8),
+        pitches,
+        velocities,
+        np.array(noteOn, dtype=bool)
+    )
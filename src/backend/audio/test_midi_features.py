@@ -0,0 +1,101 @@
+import io
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+import mido
+import numpy as np
+from rich.console import Console
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from audio.AudioSimilarity import AudioDatasetLoader
+from audio.MidiFeatures import sequence_features
+from audio.MidiIngest import channel_bytes_features
+from audio.MidiScanner import scan_notes
+
+console = Console()
+
+
+def reference_features(midiData: mido.MidiFile) -> np.ndarray:
+    """ATB, RTB and FTB features computed message by message with mido, as
+    ingest did before scan_notes replaced it"""
+    # 1. Absolute Tone Based (ATB)
+    noteFrequencies = np.zeros(128)
+
+    for track in midiData.tracks:
+        for msg in track:
+            if msg.type == 'note_on' and msg.velocity > 0:
+                noteFrequencies[msg.note] += 1
+
+    atbFeatures = noteFrequencies / np.sum(noteFrequencies) if np.sum(noteFrequencies) > 0 else noteFrequencies
+
+    # 2. Relative Tone Based (RTB)
+    rtbFeatures = np.zeros(255)
+    previousNote = None
+
+    for track in midiData.tracks:
+        for msg in track:
+            if msg.type == 'note_on' and msg.velocity > 0:
+                if previousNote is not None:
+                    rtbFeatures[msg.note - previousNote + 127] += 1
+                previousNote = msg.note
+
+    rtbFeatures = rtbFeatures / np.sum(rtbFeatures) if np.sum(rtbFeatures) > 0 else rtbFeatures
+
+    # 3. First Tone Based (FTB)
+    ftbFeatures = np.zeros(255)
+
+    for track in midiData.tracks:
+        firstNote = None
+        for msg in track:
+            if msg.type == 'note_on' and msg.velocity > 0:
+                if firstNote is None:
+                    firstNote = msg.note
+                else:
+                    ftbFeatures[msg.note - firstNote + 127] += 1
+
+    ftbFeatures = ftbFeatures / np.sum(ftbFeatures) if np.sum(ftbFeatures) > 0 else ftbFeatures
+
+    return np.concatenate([atbFeatures, rtbFeatures, ftbFeatures])
+
+
+def test_midi_features():
+    """Compare scan_notes + sequence_features against the mido reference on every
+    song in test/audios.zip, for all channels and for the channel-1 export"""
+    zipPath = Path(__file__).parent.parent.parent.parent / 'test' / 'audios.zip'
+
+    mismatches = []
+    checked = 0
+    with tempfile.TemporaryDirectory() as tempDir, zipfile.ZipFile(zipPath, 'r') as zipRef:
+        loader = AudioDatasetLoader(tempDir, clean=False)
+        for name in zipRef.namelist():
+            if not name.lower().endswith(('.mid', '.midi')):
+                continue
+            data = zipRef.read(name)
+
+            # All channels, tracks kept apart
+            expected = reference_features(mido.MidiFile(file=io.BytesIO(data)))
+            actual = sequence_features(*scan_notes(data).sequence())
+            if not np.array_equal(actual, expected):
+                mismatches.append((name, "all channels"))
+
+            # Channel 1, against the single-track export the dataset serves
+            sourcePath = loader.audios_dir / Path(name).name
+            exportPath = loader.audios_dir / f"{sourcePath.stem}_channel1.mid"
+            sourcePath.write_bytes(data)
+            loader.extract_channel1(sourcePath, exportPath)
+            expected = reference_features(mido.MidiFile(str(exportPath)))
+            actual = channel_bytes_features(data, channel=0)
+            if not np.array_equal(actual, expected):
+                mismatches.append((name, "channel 1"))
+            checked += 1
+
+    for name, kind in mismatches:
+        console.print(f"[red]Mismatch ({kind}): {name}")
+    console.print(f"[bold cyan]Checked {checked} files, {len(mismatches)} mismatches")
+    assert not mismatches
+
+
+if __name__ == "__main__":
+    test_midi_features()
@@ -0,0 +1,112 @@
+from typing import Dict, Tuple
+import numpy as np
+
+
+def squared_distances(A: np.ndarray, B: np.ndarray) -> np.ndarray:
+    """Pairwise squared Euclidean distances between rows of A and B"""
+    A_sq = np.einsum('ij,ij->i', A, A)
+    B_sq = np.einsum('ij,ij->i', B, B)
+    return np.maximum(A_sq[:, None] + B_sq[None, :] - 2 * np.dot(A, B.T), 0)
+
+
+class IVFIndex:
+    """Inverted-file index over PCA projections with a k-means coarse quantizer.
+
+    Every feature row is assigned to its nearest of n_lists centroids. A query
+    scans only the rows in its nprobe nearest lists, so nprobe trades recall for
+    latency (nprobe == n_lists is exact).
+    """
+
+    def __init__(self, n_lists: int = None, nprobe: int = 8, n_iter: int = 20, random_state: int = 0):
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.n_iter = n_iter
+        self.random_state = random_state
+        self.centroids = None
+        self.order = None
+        self.offsets = None
+        self.radii = None
+
+    def build(self, features: np.ndarray, max_train_per_list: int = 256) -> "IVFIndex":
+        """Cluster the features with Lloyd's k-means and bucket rows by centroid.
+
+        Centroids are trained on at most max_train_per_list rows per list, then
+        every row is assigned in chunks to bound memory.
+        """
+        features = np.asarray(features, dtype=np.float64)
+        n_samples = features.shape[0]
+        n_lists = self.n_lists or int(np.sqrt(n_samples))
+        n_lists = max(1, min(n_lists, n_samples))
+
+        rng = np.random.default_rng(self.random_state)
+        n_train = min(n_samples, n_lists * max_train_per_list)
+        train = features[rng.choice(n_samples, n_train, replace=False)] if n_train < n_samples else features
+        centroids = train[rng.choice(n_train, n_lists, replace=False)].copy()
+
+        for _ in range(self.n_iter):
+            assignment, _ = self._assign(train, centroids)
+            counts = np.bincount(assignment, minlength=n_lists)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, train)
+            # Empty lists keep their previous centroid
+            nonempty = counts > 0
+            updated = sums[nonempty] / counts[nonempty, None]
+            converged = np.allclose(updated, centroids[nonempty])
+            centroids[nonempty] = updated
+            if converged:
+                break
+
+        assignment, own_distance = self._assign(features, centroids)
+
+        self.centroids = centroids
+        self.order = np.argsort(assignment, kind='stable')
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=n_lists))])
+        self.radii = np.zeros(n_lists)
+        np.maximum.at(self.radii, assignment, own_distance)
+        return self
+
+    @staticmethod
+    def _assign(features: np.ndarray, centroids: np.ndarray, chunk_size: int = 65536):
+        """Nearest centroid and distance to it for every row"""
+        assignment = np.empty(features.shape[0], dtype=np.intp)
+        distance = np.empty(features.shape[0])
+        for start in range(0, features.shape[0], chunk_size):
+            squared = squared_distances(features[start:start + chunk_size], centroids)
+            nearest = np.argmin(squared, axis=1)
+            assignment[start:start + chunk_size] = nearest
+            distance[start:start + chunk_size] = np.sqrt(squared[np.arange(len(nearest)), nearest])
+        return assignment, distance
+
+    def search(self, query_features: np.ndarray, nprobe: int = None) -> Tuple[np.ndarray, float]:
+        """Candidate row indices for a query and an upper bound on its distance to any row.
+
+        The bound is max over lists of ||q - c|| + radius, which lets callers scale
+        similarity percentages without scanning the whole dataset.
+        """
+        nprobe = self.nprobe if nprobe is None else nprobe
+        if nprobe < 1:
+            raise ValueError(f"nprobe must be at least 1, got {nprobe}")
+        nprobe = min(nprobe, len(self.centroids))
+        centroid_distances = np.sqrt(squared_distances(np.atleast_2d(query_features), self.centroids)[0])
+
+        probe = np.argpartition(centroid_distances, nprobe - 1)[:nprobe]
+        candidates = np.concatenate([self.order[self.offsets[l]:self.offsets[l + 1]] for l in probe])
+        max_distance = float(np.max(centroid_distances + self.radii))
+        return candidates, max_distance
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            'ivf_centroids': self.centroids,
+            'ivf_order': self.order,
+            'ivf_offsets': self.offsets,
+            'ivf_radii': self.radii,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], nprobe: int = 8) -> "IVFIndex":
+        index = cls(n_lists=len(arrays['ivf_centroids']), nprobe=nprobe)
+        index.centroids = np.asarray(arrays['ivf_centroids'])
+        index.order = np.asarray(arrays['ivf_order'])
+        index.offsets = np.asarray(arrays['ivf_offsets'])
+        index.radii = np.asarray(arrays['ivf_radii'])
+        return index
@@ -0,0 +1,102 @@
+from typing import Dict
+import numpy as np
+
+
+class FeatureStore:
+    """Compact storage for the PCA projections of the dataset.
+
+    dtype "float64" keeps the projections as computed, "float32" and "float16"
+    store them at reduced precision and "int8" applies symmetric per-dimension
+    scalar quantization (z ~= code * scale). Distances are computed on the stored
+    form in row chunks, so the full-precision matrix is never rebuilt.
+    """
+
+    DTYPES = ("float64", "float32", "float16", "int8")
+
+    def __init__(self, dtype: str = "float64", chunk_size: int = 65536):
+        if dtype not in self.DTYPES:
+            raise ValueError(f"Unknown feature dtype '{dtype}', expected one of {self.DTYPES}")
+        self.dtype = dtype
+        self.chunk_size = chunk_size
+        self.data = None
+        self.scale = None
+        self.sq_norms = None
+
+    def __len__(self) -> int:
+        return 0 if self.data is None else self.data.shape[0]
+
+    @property
+    def compute_dtype(self):
+        return np.float64 if self.dtype == "float64" else np.float32
+
+    def encode(self, features: np.ndarray) -> "FeatureStore":
+        """Store features (N x k) in the configured representation"""
+        features = np.asarray(features)
+        if self.dtype == "int8":
+            max_abs = np.abs(features).max(axis=0) if len(features) else np.zeros(features.shape[1])
+            self.scale = (np.where(max_abs > 0, max_abs, 1) / 127).astype(np.float32)
+            self.data = np.clip(np.rint(features / self.scale), -127, 127).astype(np.int8)
+        else:
+            self.scale = None
+            self.data = features.astype(self.dtype)
+
+        # Norms of the stored (dequantized) vectors, for ||a||^2 + ||b||^2 - 2ab
+        self.sq_norms = np.empty(len(self.data), dtype=self.compute_dtype)
+        for start in range(0, len(self.data), self.chunk_size):
+            chunk = self.decode(slice(start, start + self.chunk_size))
+            self.sq_norms[start:start + len(chunk)] = np.einsum('ij,ij->i', chunk, chunk)
+        return self
+
+    def decode(self, rows=None) -> np.ndarray:
+        """Dequantized features for the given rows (all rows by default)"""
+        data = self.data if rows is None else self.data[rows]
+        if self.scale is not None:
+            return data.astype(np.float32) * self.scale
+        return data.astype(self.compute_dtype, copy=False)
+
+    def squared_distances(self, query_features: np.ndarray, rows: np.ndarray = None) -> np.ndarray:
+        """Squared Euclidean distances from B queries to the stored rows (B x N)"""
+        queries = np.atleast_2d(query_features).astype(self.compute_dtype)
+        query_sq_norms = np.einsum('ij,ij->i', queries, queries)
+        # For int8 fold the scale into the queries: (q * s) . code == q . (code * s)
+        weighted = queries * self.scale if self.scale is not None else queries
+
+        data = self.data if rows is None else self.data[rows]
+        sq_norms = self.sq_norms if rows is None else self.sq_norms[rows]
+        squared = np.empty((len(queries), len(data)), dtype=self.compute_dtype)
+        for start in range(0, len(data), self.chunk_size):
+            chunk = data[start:start + self.chunk_size].astype(self.compute_dtype, copy=False)
+            squared[:, start:start + len(chunk)] = np.dot(weighted, chunk.T)
+        squared *= -2
+        squared += query_sq_norms[:, None]
+        squared += sq_norms[None, :]
+        return np.maximum(squared, 0, out=squared)
+
+    @classmethod
+    def max_components(cls, dtype: str, bytes_per_image: float) -> int:
+        """Largest k whose stored row (codes plus norm) fits in bytes_per_image"""
+        norm_bytes = 8 if dtype == "float64" else 4
+        return max(1, int((bytes_per_image - norm_bytes) // np.dtype(dtype).itemsize))
+
+    @property
+    def nbytes(self) -> int:
+        total = 0 if self.data is None else self.data.nbytes + self.sq_norms.nbytes
+        return total + (0 if self.scale is None else self.scale.nbytes)
+
+    @property
+    def bytes_per_image(self) -> float:
+        return self.nbytes / len(self) if len(self) else 0.0
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        arrays = {'dataset_features': self.data, 'feature_sq_norms': self.sq_norms}
+        if self.scale is not None:
+            arrays['feature_scale'] = self.scale
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], dtype: str) -> "FeatureStore":
+        store = cls(dtype)
+        store.data = arrays['dataset_features']
+        store.sq_norms = arrays['feature_sq_norms']
+        store.scale = arrays.get('feature_scale')
+        return store
@@ -1,16 +1,27 @@
 import json
+import hashlib
 import zipfile
 import shutil
 from rich.console import Console
 from rich.table import Table
-from typing import List, Dict
+from typing import Callable, List, Dict
 from pathlib import Path
 import os
 import time
 import logging
-import cv2
 import numpy as np
-from PIL import Image
+from image.PCAEngine import PCAEngine
+from image.IndexStore import ImageIndexStore
+from image.Ingest import (PREPROCESS_MODES, decode_pixels, preprocess_pixels, preprocess_images,
+                          read_source, timed_decode_pixels, write_members)
+from image.AnnIndex import IVFIndex
+from image.FeatureStore import FeatureStore
+from image.QueryCache import QueryCache
+from image.PerceptualHash import PerceptualHashIndex, dhash_rows
+from image.PixelCache import PixelCache
+from image.IndexSnapshot import ImageIndex
+from SearchLog import SearchLogger
+from StageTimer import StageTimer
 
 console = Console()
 
@@ -18,20 +29,20 @@ logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 class ImageDatasetLoader:
-    def __init__(self, temp_extracted_path, test_dir: str = "../../test"):
+    def __init__(self, temp_extracted_path, test_dir: str = "../../test", clean: bool = True):
         self.test_dir = Path(test_dir)
         self.temp_dir = Path(temp_extracted_path)
         self.images_dir = self.temp_dir / "images"
         self.mapper_data = None
         
-        # Add cleanup on initialization
-        if self.temp_dir.exists():
+        # Add cleanup on initialization (skipped on warm start so indexed images stay available)
+        if clean and self.temp_dir.exists():
             try:
                 shutil.rmtree(self.temp_dir)
             except Exception as e:
                 console.print(f"[red]Warning: Could not clean up existing temp directory: {e}")
         
-        self.temp_dir.mkdir(exist_ok=True)
+        self.temp_dir.mkdir(parents=True, exist_ok=True)
         self.images_dir.mkdir(exist_ok=True)
     
     def extract_zip(self, zip_path: str, extract_to: Path):
@@ -81,6 +92,54 @@ class ImageDatasetLoader:
         console.print(f"[green]Dataset setup completed in {setup_time:.2f} seconds")
         return image_metadata
     
+    def setup_dataset_streaming(self, zip_path, mapper_path: None):
+        """Build image metadata from the zip listing without extracting anything.
+
+        Each entry carries the zip "member" to decode; "path" is where the original
+        is written for display if the processor keeps originals.
+        """
+        start_time = time.time()
+        console.print("[bold blue]Setting up dataset from zip...")
+        with zipfile.ZipFile(str(self.test_dir / zip_path), 'r') as zip_ref:
+            members = {Path(info.filename).name: info.filename for info in zip_ref.infolist() if not info.is_dir()}
+        
+        image_metadata = []
+        if mapper_path:
+            self.load_mapper(mapper_path)
+            for song in self.mapper_data["songs"]:
+                member = self.find_zip_member(members, song["album"])
+                if member:
+                    image_metadata.append({
+                        "path": str(self.images_dir / Path(member).name),
+                        "member": member,
+                        "song": song["song"],
+                        "singer": song["singer"],
+                        "genre": song["genre"],
+                        "album": song["album"],
+                        "audio": song["audio"]
+                    })
+        else:
+            for album, member in members.items():
+                image_metadata.append({
+                    "path": str(self.images_dir / album),
+                    "member": member,
+                    "song": album,
+                    "singer": "-",
+                    "genre": "-",
+                    "album": album,
+                    "audio":"-"
+                })
+        setup_time = time.time() - start_time
+        console.print(f"[green]Dataset setup completed in {setup_time:.2f} seconds")
+        return image_metadata
+    
+    def find_zip_member(self, members: Dict[str, str], filename: str) -> str:
+        base_name = Path(filename).stem
+        for ext in ['.jpg', '.jpeg', '.png']:
+            if f"{base_name}{ext}" in members:
+                return members[f"{base_name}{ext}"]
+        return None
+    
     def find_image_file(self, filename: str) -> Path:
         base_name = Path(filename).stem
         for ext in ['.jpg', '.jpeg', '.png']:
@@ -94,74 +153,225 @@ class ImageDatasetLoader:
             shutil.rmtree(self.temp_dir)
 
 class ImageProcessor:
-    def __init__(self, temp_extracted_path, target_size=(64, 64), similarity_threshold=60):
+    def __init__(self, temp_extracted_path, target_size=(64, 64), similarity_threshold=60, pca_method="auto",
+                 n_components=100, refit_threshold=0.25, variance_target=None, max_bytes_per_image=None, clean_temp=True, num_workers=None, chunk_size=64,
+                 ingest_mode="extract", write_originals=True, ann=None, ann_lists=None, ann_nprobe=8,
+                 feature_dtype="float64", cache_entries=1024, cache_ttl=600.0,
+                 phash_radius=None, preprocess_mode="pil", pixel_cache_dir=None, log_level="WARNING",
+                 log_sample_rate=1.0):
+        if ingest_mode not in ("extract", "stream"):
+            raise ValueError(f"Unknown ingest mode '{ingest_mode}', expected 'extract' or 'stream'")
         self.target_size = target_size
-        self.dataset_features = None
-        self.U_k = None
-        self.mean_vector = None
-        self.image_metadata = []
-        self.dataset_loader = ImageDatasetLoader(temp_extracted_path)
+        if ann not in (None, "ivf"):
+            raise ValueError(f"Unknown ANN index '{ann}', expected None or 'ivf'")
+        if preprocess_mode not in PREPROCESS_MODES:
+            raise ValueError(f"Unknown preprocess mode '{preprocess_mode}', expected one of {PREPROCESS_MODES}")
+        if feature_dtype not in FeatureStore.DTYPES:
+            raise ValueError(f"Unknown feature dtype '{feature_dtype}', expected one of {FeatureStore.DTYPES}")
+        self.ingest_mode = ingest_mode
+        self.preprocess_mode = preprocess_mode
+        self.feature_dtype = feature_dtype
+        self.ann = ann
+        self.ann_lists = ann_lists
+        self.ann_nprobe = ann_nprobe
+        self.write_originals = write_originals
+        self.pixel_cache_dir = pixel_cache_dir
+        self._pixel_cache = None
+        self.num_workers = num_workers
+        self.chunk_size = chunk_size
+        self.pca_engine = PCAEngine(pca_method)
+        self.n_components = n_components
+        self.variance_target = variance_target
+        self.max_bytes_per_image = max_bytes_per_image
+        self.refit_threshold = refit_threshold
+        self.phash_radius = phash_radius
+        self.query_cache = QueryCache(cache_entries, cache_ttl)
+        self.search_log = SearchLogger("image", log_level, log_sample_rate)
+        self.index = None
+        self.dataset_loader = ImageDatasetLoader(temp_extracted_path, clean=clean_temp)
         self.similarity_threshold = similarity_threshold
         self.load_time = 0
+        self.load_stages = {}
         self.processing_time = 0
 
+    def current_index(self, index: ImageIndex = None) -> ImageIndex:
+        """The given snapshot, or the installed one; raises if no index is loaded"""
+        index = self.index if index is None else index
+        if index is None:
+            raise ValueError("No dataset features available. Please load dataset first.")
+        return index
+
+    # Read-only views of the installed snapshot
+    @property
+    def feature_store(self) -> FeatureStore:
+        return None if self.index is None else self.index.feature_store
+
+    @property
+    def dataset_features(self) -> np.ndarray:
+        """PCA projections of the dataset, dequantized from the feature store"""
+        return None if self.index is None else self.index.dataset_features
+
+    @property
+    def U_k(self) -> np.ndarray:
+        return None if self.index is None else self.index.U_k
+
+    @property
+    def mean_vector(self) -> np.ndarray:
+        return None if self.index is None else self.index.mean_vector
+
+    @property
+    def explained_variance(self) -> float:
+        return None if self.index is None else self.index.explained_variance
+
+    @property
+    def pca_summary(self) -> Dict:
+        return None if self.index is None else self.index.pca_summary
+
+    @property
+    def phash_index(self) -> PerceptualHashIndex:
+        return None if self.index is None else self.index.phash_index
+
+    @property
+    def ann_index(self) -> IVFIndex:
+        return None if self.index is None else self.index.ann_index
+
+    @property
+    def image_metadata(self) -> List[Dict]:
+        return [] if self.index is None else self.index.image_metadata
+
+    @property
+    def index_version(self) -> int:
+        return 0 if self.index is None else self.index.version
+
+    def pixel_cache(self, mode: str = None) -> PixelCache:
+        """Preprocessed-pixel cache for a preprocess mode (default: the processor's), None when disabled"""
+        if self.pixel_cache_dir is None:
+            return None
+        mode = self.preprocess_mode if mode is None else mode
+        settings = (tuple(self.target_size), mode)
+        if self._pixel_cache is None or self._pixel_cache.settings != settings:
+            self._pixel_cache = PixelCache(self.pixel_cache_dir, self.target_size, mode)
+        return self._pixel_cache
+
+    def index_stats(self) -> Dict:
+        """Size of the stored index, including memory per image"""
+        index = self.index
+        if index is None:
+            return {'images': 0}
+        return {
+            'images': len(index.feature_store),
+            'components': int(index.U_k.shape[1]),
+            'feature_dtype': index.feature_store.dtype,
+            'preprocess_mode': index.preprocess_mode,
+            'bytes_per_image': index.feature_store.bytes_per_image,
+            'index_bytes': index.feature_store.nbytes,
+        }
+
+    def project(self, X: np.ndarray, U_k: np.ndarray, mean_vector: np.ndarray, chunk_size: int = 4096) -> np.ndarray:
+        """Project pixel rows to PCA space in chunks, so X is never promoted to float64 as a whole"""
+        features = np.empty((X.shape[0], U_k.shape[1]))
+        for start in range(0, X.shape[0], chunk_size):
+            features[start:start + chunk_size] = np.dot((X[start:start + chunk_size] - mean_vector), U_k)
+        return features
+
     def preprocess_image(self, image: np.ndarray) -> np.ndarray:
-        """Convert image to grayscale, resize, and flatten"""
-        # Convert to PIL Image if not already
-        if not isinstance(image, Image.Image):
-            # If it's a numpy array with 3 channels, convert to grayscale
-            if len(image.shape) == 3:
-                image = Image.fromarray(image).convert('L')
-            else:
-                image = Image.fromarray(image)
-        
-        # Resize the image
-        resized = image.resize(self.target_size, Image.LANCZOS)
-        
-        # Convert to numpy array and flatten
-        return np.array(resized).flatten()
+        """Convert image to grayscale, resize, and flatten, as the installed index was built"""
+        index = self.index
+        mode = self.preprocess_mode if index is None else index.preprocess_mode
+        return preprocess_pixels(image, self.target_size, mode)
 
-    def compute_pca(self, X: np.ndarray, k: int = 100):
-        """Manual PCA computation using eigendecomposition"""
-        n_samples = X.shape[0]
-        
-        # Compute mean and center the data
-        mean_vector = np.mean(X, axis=0)
-        X_centered = X - mean_vector
-        
-        # Compute covariance matrix C = (1/N)X'X
-        C = np.dot(X_centered.T, X_centered) / n_samples
-        C = np.dot(C, C.T)
-        
-        # Compute eigenvalues and eigenvectors
-        eigenvalues, eigenvectors = np.linalg.eigh(C)
-        
-        # Sort eigenvalues and eigenvectors in descending order
-        idx = eigenvalues.argsort()[::-1]
-        eigenvalues = eigenvalues[idx]
-        eigenvectors = eigenvectors[:, idx]
+    def preprocess_bytes(self, contents: bytes, index: ImageIndex = None, timer: StageTimer = None) -> np.ndarray:
+        """Decode and preprocess an encoded image exactly as the index was built, None if invalid.
+
+        With a timer the two steps are recorded as the "decode" and "preprocess" stages.
+        """
+        index = self.index if index is None else index
+        mode = self.preprocess_mode if index is None else index.preprocess_mode
+        if timer is None:
+            return decode_pixels(contents, self.target_size, mode)
+        pixels, stages = timed_decode_pixels(contents, self.target_size, mode)
+        for name, seconds in stages.items():
+            timer.add(name, seconds)
+        return pixels
+
+    def compute_pca(self, X: np.ndarray, k: int = 100, variance_target: float = None,
+                    max_bytes_per_image: float = None, feature_dtype: str = None):
+        """PCA via the configured engine (Gram trick, thin or randomized SVD).
+
+        k is an upper bound: with a variance_target the smallest k reaching it is
+        kept, and max_bytes_per_image caps k so a row stored as feature_dtype fits
+        the budget. All three default to the processor's settings and the values
+        used are recorded in the summary. Returns (U_k, mean_vector, eigenvalues,
+        total_variance, summary) without touching the installed index.
+        """
+        variance_target = self.variance_target if variance_target is None else variance_target
+        max_bytes_per_image = self.max_bytes_per_image if max_bytes_per_image is None else max_bytes_per_image
+        feature_dtype = self.feature_dtype if feature_dtype is None else feature_dtype
+        U_k, mean_vector, eigenvalues, total_variance, method = self.pca_engine.fit(X, k)
         
-        # Select k principal components
-        k = min(k, len(eigenvalues))
-        U_k = eigenvectors[:, :k]
+        # Cumulative explained variance (%) for 1..k components
+        curve = np.cumsum(eigenvalues) / total_variance * 100 if total_variance > 0 else np.full(len(eigenvalues), 100.0)
+        k = self.select_components(curve, variance_target, max_bytes_per_image, feature_dtype)
+        U_k, eigenvalues = U_k[:, :k], eigenvalues[:k]
         
-        # Print explained variance
-        explained_variance = eigenvalues[:k].sum() / eigenvalues.sum() * 100
-        console.print(f"[yellow]Using {k} components explaining {explained_variance:.2f}% of variance")
+        explained_variance = self._explained_variance(eigenvalues, total_variance)
+        summary = {
+            'k': k,
+            'method': method,
+            'explained_variance': explained_variance,
+            'variance_target': variance_target,
+            'max_bytes_per_image': max_bytes_per_image,
+            'curve': [round(float(value), 4) for value in curve],
+        }
+        console.print(f"[yellow]Using {k} components ({method}) explaining {explained_variance:.2f}% of variance")
         
-        return U_k, mean_vector
+        # The spectrum is kept so later appends can update the subspace incrementally
+        return U_k, mean_vector, eigenvalues, total_variance, summary
+
+    def select_components(self, curve: np.ndarray, variance_target: float = None,
+                          max_bytes_per_image: float = None, feature_dtype: str = None) -> int:
+        """Smallest k meeting the variance target, within the memory budget"""
+        feature_dtype = self.feature_dtype if feature_dtype is None else feature_dtype
+        k = len(curve)
+        if variance_target is not None:
+            # Accept either a fraction (0.95) or a percentage (95)
+            target = variance_target * 100 if variance_target <= 1 else variance_target
+            reached = np.flatnonzero(curve >= target - 1e-9)
+            if len(reached):
+                k = int(reached[0]) + 1
+        if max_bytes_per_image is not None:
+            k = min(k, FeatureStore.max_components(feature_dtype, max_bytes_per_image))
+        return k
+
+    @staticmethod
+    def _explained_variance(eigenvalues: np.ndarray, total_variance: float) -> float:
+        return float(eigenvalues.sum() / total_variance * 100) if total_variance > 0 else 100.0
 
     def process_query_image(self, image: np.ndarray) -> np.ndarray:
         """Process query image according to PCA projection formula"""
-        processed_query = self.preprocess_image(image)
+        return self.project_query(self.preprocess_image(image))
+
+    def project_query(self, processed_query: np.ndarray, index: ImageIndex = None) -> np.ndarray:
+        """Project a preprocessed query row"""
+        index = self.current_index(index)
         # Project query image: q = (q' - μ)Uk
-        q = np.dot((processed_query - self.mean_vector), self.U_k)
+        q = np.dot((processed_query - index.mean_vector), index.U_k)
         return q
 
-    def calculate_similarity_percentage(self, query_features: np.ndarray) -> np.ndarray:
+    def process_query_images(self, images: List[np.ndarray]) -> np.ndarray:
+        """Project a batch of query images with one (B x D)(D x k) product"""
+        return self.project_queries(np.stack([self.preprocess_image(image) for image in images]))
+
+    def project_queries(self, processed_queries: np.ndarray, index: ImageIndex = None) -> np.ndarray:
+        """Project a batch of preprocessed query rows (B x D)"""
+        index = self.current_index(index)
+        return np.dot((processed_queries.astype(np.float32) - index.mean_vector), index.U_k)
+
+    def calculate_similarity_percentage(self, query_features: np.ndarray, index: ImageIndex = None) -> np.ndarray:
         """Calculate Euclidean distances and convert to similarity percentages"""
+        index = self.current_index(index)
         # Calculate Euclidean distances between query and all dataset images
-        distances = np.sqrt(np.sum((self.dataset_features - query_features) ** 2, axis=1))
+        distances = np.sqrt(index.feature_store.squared_distances(query_features)[0])
         
         # Convert distances to similarity percentages (inverse relationship)
         max_distance = np.max(distances) if np.max(distances) != 0 else 1
@@ -169,6 +379,31 @@ class ImageProcessor:
         
         return similarities
 
+    def calculate_similarity_matrix(self, query_features: np.ndarray, index: ImageIndex = None) -> np.ndarray:
+        """Similarity percentages of B queries against all dataset images (B x N).
+
+        Uses ||a - b||^2 = ||a||^2 + ||b||^2 - 2ab so all distances come out of a
+        single matrix product instead of a broadcasted difference per query.
+        """
+        distances = np.sqrt(self.current_index(index).feature_store.squared_distances(query_features))
+        
+        max_distances = distances.max(axis=1, keepdims=True)
+        max_distances[max_distances == 0] = 1
+        return 100 * (1 - distances / max_distances)
+
+    def calculate_candidate_similarities(self, query_features: np.ndarray, nprobe: int = None,
+                                         index: ImageIndex = None):
+        """Similarity percentages for the IVF candidates of a query, as (indices, similarities).
+
+        Distances are scaled by the index's upper bound on the farthest row rather
+        than the exact maximum, which would need a full scan.
+        """
+        index = self.current_index(index)
+        candidates, max_distance = index.ann_index.search(query_features, nprobe)
+        distances = np.sqrt(index.feature_store.squared_distances(query_features, rows=candidates)[0])
+        max_distance = max_distance if max_distance != 0 else 1
+        return candidates, 100 * (1 - distances / max_distance)
+
     def create_results_table(self, results: Dict) -> Table:
         """Create a formatted table for results"""
         table = Table(show_header=True, header_style="bold magenta", title="Search Results")
@@ -176,8 +411,8 @@ class ImageProcessor:
         table.add_column("Metric", style="cyan")
         table.add_column("Value", style="green")
         
-        table.add_row("Processing Time", f"{self.processing_time:.2f} seconds")
-        table.add_row("Dataset Load Time", f"{self.load_time:.2f} seconds")
+        table.add_row("Processing Time", f"{results['processing_metrics']['processing_time']:.2f} seconds")
+        table.add_row("Dataset Load Time", f"{results['processing_metrics']['load_time']:.2f} seconds")
         table.add_row("Matches Found", str(results['matches_found']))
         
         return table
@@ -203,90 +438,640 @@ class ImageProcessor:
         
         return table
 
-    def load_dataset(self, temp_zip, mapper_path: None):
-        """Load and process the dataset with timing"""
+    def load_images(self, image_metadata: List[Dict], archive: str = None, progress: Callable = None,
+                    mode: str = None):
+        """Read and preprocess images in parallel, dropping entries that cannot be decoded.
+
+        mode defaults to the processor's preprocess mode; appends pass the index's.
+        With archive set, entries are decoded straight from that zip by member name.
+        The decode workers hash the bytes they read, and loaded entries carry that
+        sha256 as their "pixel_key" so appends can tell a changed image from a
+        duplicate. With a pixel cache, rows already cached (by content hash and
+        preprocessing settings) are read from it instead of being decoded; entries
+        with a known key are then not read at all.
+        """
+        def report(done, total):
+            console.print(f"[cyan]Processed {done}/{total} images")
+            if progress:
+                progress("preprocess", done / total)
+        
+        if progress:
+            progress("preprocess", 0.0)
+        sources = [metadata["member"] if archive else metadata["path"] for metadata in image_metadata]
+        write_dir = str(self.dataset_loader.images_dir) if archive and self.write_originals else None
+        if write_dir is not None:
+            # The audio loader shares temp_extracted and may have cleared it since setup
+            os.makedirs(write_dir, exist_ok=True)
+        mode = self.preprocess_mode if mode is None else mode
+        pixel_cache = self.pixel_cache(mode)
+        if pixel_cache is None:
+            X, loaded, keys = preprocess_images(
+                sources, self.target_size, num_workers=self.num_workers, chunk_size=self.chunk_size,
+                progress=report, archive=archive, write_dir=write_dir, mode=mode, hash_keys=True
+            )
+            loaded_metadata = [
+                {**metadata, "pixel_key": key}
+                for metadata, key, ok in zip(image_metadata, keys, loaded) if ok
+            ]
+            return X, loaded_metadata
+        
+        # Entries loaded before already know their key and are read without touching the source
+        keys = [metadata.get("pixel_key") for metadata in image_metadata]
+        cached = pixel_cache.contains(keys)
+        hits, misses = np.flatnonzero(cached), np.flatnonzero(~cached)
+        if write_dir is not None and len(hits):
+            write_members(archive, [sources[i] for i in hits], write_dir)
+        
+        X = np.empty((len(sources), self.target_size[0] * self.target_size[1]), dtype=np.float32)
+        X[hits] = pixel_cache.read([keys[i] for i in hits])
+        loaded = cached.copy()
+        decoded = np.empty(0, dtype=np.intp)
+        if len(misses):
+            # The workers hash what they read and skip decoding rows the cache already has
+            X_miss, miss_loaded, miss_keys = preprocess_images(
+                [sources[i] for i in misses], self.target_size, num_workers=self.num_workers,
+                chunk_size=self.chunk_size, progress=report, archive=archive, write_dir=write_dir,
+                mode=mode, hash_keys=True, skip_keys=pixel_cache.keys()
+            )
+            for i, key in zip(misses, miss_keys):
+                keys[i] = key
+            decoded = misses[miss_loaded]
+            X[decoded] = X_miss
+            pixel_cache.add([keys[i] for i in decoded], X_miss)
+            found = misses[~miss_loaded & pixel_cache.contains(miss_keys)]
+            X[found] = pixel_cache.read([keys[i] for i in found])
+            loaded[misses] = miss_loaded
+            loaded[found] = True
+        console.print(f"[cyan]Pixel cache: {int(loaded.sum()) - len(decoded)} cached, {len(decoded)} decoded")
+        
+        loaded_metadata = [
+            {**metadata, "pixel_key": key}
+            for metadata, key, ok in zip(image_metadata, keys, loaded) if ok
+        ]
+        return (X if loaded.all() else X[loaded]), loaded_metadata
+
+    def content_keys(self, image_metadata: List[Dict], archive: str = None) -> List[str]:
+        """sha256 of each entry's bytes, read from the zip at archive or from disk (None if unreadable)"""
+        zip_ref = zipfile.ZipFile(archive, 'r') if archive is not None else None
+        try:
+            keys = []
+            for metadata in image_metadata:
+                data = read_source(metadata["member"] if archive else metadata["path"], zip_ref)
+                keys.append(hashlib.sha256(data).hexdigest() if data is not None else None)
+            return keys
+        finally:
+            if zip_ref is not None:
+                zip_ref.close()
+
+    def can_reload(self, image_metadata: List[Dict], mode: str = None) -> bool:
+        """Whether every entry can be read again, from the pixel cache or its original on disk"""
+        pixel_cache = self.pixel_cache(mode)
+        return all(
+            (pixel_cache is not None and metadata.get("pixel_key") in pixel_cache.index)
+            or os.path.exists(metadata["path"])
+            for metadata in image_metadata
+        )
+
+    def fit_index(self, image_metadata: List[Dict], archive: str = None, progress: Callable = None,
+                  variance_target: float = None, max_bytes_per_image: float = None):
+        """Fit PCA from scratch on the given images and project all of them"""
+        X, image_metadata = self.load_images(image_metadata, archive, progress)
+        self.fit_arrays(X, image_metadata, progress, variance_target, max_bytes_per_image)
+
+    def fit_arrays(self, X: np.ndarray, image_metadata: List[Dict], progress: Callable = None,
+                   variance_target: float = None, max_bytes_per_image: float = None,
+                   feature_dtype: str = None, preprocess_mode: str = None):
+        """Fit PCA on preprocessed pixel rows and install the resulting index;
+        the component selection, storage and preprocessing settings apply to this
+        fit only (preprocess_mode is the mode X was decoded with)"""
+        if X.shape[0] == 0:
+            raise ValueError("No readable images found in dataset")
+        
+        # Compute PCA
+        if progress:
+            progress("pca", 0.0)
+        k = min(self.n_components, X.shape[0])  # Number of principal components
+        U_k, mean_vector, eigenvalues, total_variance, summary = self.compute_pca(
+            X, k, variance_target, max_bytes_per_image, feature_dtype
+        )
+        
+        # Project all images to PCA space: Z = X'Uk
+        if progress:
+            progress("projection", 0.0)
+        features = self.project(X, U_k, mean_vector)
+        if progress:
+            progress("index", 0.0)
+        phash_index = PerceptualHashIndex(dhash_rows(X, self.target_size))
+        self.install_index(U_k, mean_vector, eigenvalues, total_variance, summary,
+                           features, phash_index, image_metadata, feature_dtype, preprocess_mode)
+
+    def install_index(self, U_k: np.ndarray, mean_vector: np.ndarray, eigenvalues: np.ndarray,
+                      total_variance: float, pca_summary: Dict, features: np.ndarray,
+                      phash_index: PerceptualHashIndex, image_metadata: List[Dict], feature_dtype: str = None,
+                      preprocess_mode: str = None):
+        """Build a snapshot from freshly computed parts and swap it in.
+
+        feature_dtype and preprocess_mode default to the processor's. Searches keep
+        running against the previous snapshot until the assignment.
+        """
+        feature_dtype = self.feature_dtype if feature_dtype is None else feature_dtype
+        preprocess_mode = self.preprocess_mode if preprocess_mode is None else preprocess_mode
+        feature_store = FeatureStore(feature_dtype).encode(features)
+        ann_index = self.build_ann_index(feature_store.decode())
+        self.swap_index(ImageIndex(
+            U_k, mean_vector, eigenvalues, total_variance, pca_summary, feature_store,
+            phash_index, ann_index, image_metadata, preprocess_mode, self.index_version + 1
+        ))
+
+    def setup_dataset(self, temp_zip, mapper_path: None):
+        """Collect metadata for a dataset zip, returning (image_metadata, archive).
+
+        archive is the zip to decode members from in streaming mode, None when the
+        zip has been extracted and images are read from disk.
+        """
+        if self.ingest_mode == "stream":
+            image_metadata = self.dataset_loader.setup_dataset_streaming(temp_zip, mapper_path)
+            return image_metadata, str(self.dataset_loader.test_dir / temp_zip)
+        return self.dataset_loader.setup_dataset(temp_zip, mapper_path), None
+
+    def swap_index(self, index: ImageIndex):
+        """Atomically replace the served snapshot and drop cached queries.
+
+        Cache keys include the snapshot version, so entries a search on the old
+        snapshot stores after the clear can never be served for the new one.
+        """
+        self.index = index
+        self.query_cache.clear()
+
+    def build_ann_index(self, features: np.ndarray) -> IVFIndex:
+        """Approximate nearest-neighbour index over the given projections, None if disabled"""
+        if self.ann is None:
+            return None
+        start_time = time.time()
+        ann_index = IVFIndex(n_lists=self.ann_lists, nprobe=self.ann_nprobe).build(features)
+        console.print(f"[yellow]Built IVF index with {len(ann_index.centroids)} lists in {time.time() - start_time:.2f} seconds")
+        return ann_index
+
+    @staticmethod
+    def stage_reporter(timer: StageTimer, progress: Callable = None) -> Callable:
+        """progress(stage, fraction) callback that also times each stage on timer"""
+        def report(stage, fraction=0.0):
+            timer.mark(stage)
+            if progress:
+                progress(stage, fraction)
+        return report
+
+    def load_dataset(self, temp_zip, mapper_path: None, variance_target: float = None,
+                     max_bytes_per_image: float = None, progress: Callable = None) -> Dict:
+        """Load and process the dataset with timing.
+
+        variance_target / max_bytes_per_image, when given, override the processor's
+        component selection settings for this dataset; refits after appends reuse
+        the values recorded in its PCA summary. progress(stage, fraction)
+        is called as ingest advances; the previous index keeps serving searches until
+        the new one is installed. Per-stage times end up in load_stages. Returns the
+        PCA summary.
+        """
         start_time = time.time()
+        timer = StageTimer()
+        progress = self.stage_reporter(timer, progress)
         
         with console.status("[bold green]Loading dataset...") as status:
-            # Load images
-            self.image_metadata = self.dataset_loader.setup_dataset(temp_zip, mapper_path)
-            processed_images = []
-            
-            for idx, metadata in enumerate(self.image_metadata):
-                image = cv2.imread(metadata["path"])
-                if image is not None:
-                    processed = self.preprocess_image(image)
-                    processed_images.append(processed)
-                console.print(f"[cyan]Processing image {idx+1}/{len(self.image_metadata)}")
-            
-            X = np.array(processed_images)
-            
-            # Compute PCA
-            k = min(100, X.shape[0])  # Number of principal components
-            self.U_k, self.mean_vector = self.compute_pca(X, k)
-            
-            # Project all images to PCA space: Z = X'Uk
-            self.dataset_features = np.dot((X - self.mean_vector), self.U_k)
+            progress("extract")
+            image_metadata, archive = self.setup_dataset(temp_zip, mapper_path)
+            self.fit_index(image_metadata, archive, progress, variance_target, max_bytes_per_image)
         
+        timer.stop()
+        self.load_stages = timer.as_dict()
         self.load_time = time.time() - start_time
         console.print(f"[bold green]Dataset loaded and processed in {self.load_time:.2f} seconds")
+        return self.pca_summary
+
+    def add_images(self, temp_zip, mapper_path: None, refit_threshold: float = None,
+                   progress: Callable = None) -> Dict:
+        """Append images to a fitted index.
 
-    def search_similar_images(self, query_features: np.ndarray) -> Dict:
-        """Search for similar images using Euclidean distance"""
+        The mean and principal subspace are updated incrementally and only the new
+        images are decoded and projected; existing projections are rotated into the
+        updated basis. If the batch grows the index by more than refit_threshold
+        (a fraction of the current size) PCA is refitted on every image instead.
+        Either way images are decoded with the index's preprocess mode and the
+        projections keep the dtype it is stored in.
+
+        An image whose path is already indexed is skipped if its content hash is
+        unchanged and otherwise replaces the indexed one; replacements refit PCA
+        when the remaining originals can be read again, since the incremental
+        update cannot take the old image out of the subspace.
+        """
         start_time = time.time()
+        refit_threshold = self.refit_threshold if refit_threshold is None else refit_threshold
         
-        if self.dataset_features is None:
-            raise ValueError("No dataset features available. Please load dataset first.")
-
-        # Calculate similarities
-        similarities = self.calculate_similarity_percentage(query_features)
+        index = self.index
+        if index is None:
+            self.load_dataset(temp_zip, mapper_path, progress=progress)
+            return {'added': len(self.image_metadata), 'replaced': 0, 'total': len(self.image_metadata),
+                    'refit': True, 'stages': self.load_stages}
         
-        # Process results
-        all_similarities = []
-        matching_results = []
-
-        for idx, similarity in enumerate(similarities):
-            metadata = self.image_metadata[idx]
-            console.print(metadata)
-            similarity_info = {
-                'song': metadata['song'],
-                'singer': metadata['singer'],
-                'genre': metadata['genre'],
-                'album': metadata['album'],
-                'similarity_percentage': round(float(similarity), 2)
+        timer = StageTimer()
+        progress = self.stage_reporter(timer, progress)
+        with console.status("[bold green]Appending to dataset...") as status:
+            progress("extract")
+            known_keys = {metadata["path"]: metadata.get("pixel_key") for metadata in index.image_metadata}
+            image_metadata, archive = self.setup_dataset(temp_zip, mapper_path)
+            # Same path only counts as a duplicate if the bytes match; entries indexed
+            # without a key cannot be compared and are replaced
+            known = [metadata for metadata in image_metadata if metadata["path"] in known_keys]
+            changed = {
+                metadata["path"] for metadata, key in zip(known, self.content_keys(known, archive))
+                if key is None or key != known_keys[metadata["path"]]
             }
+            new_metadata = [
+                metadata for metadata in image_metadata
+                if metadata["path"] not in known_keys or metadata["path"] in changed
+            ]
+            keep = np.array([
+                row for row, metadata in enumerate(index.image_metadata) if metadata["path"] not in changed
+            ], dtype=np.intp)
+            kept_metadata = [index.image_metadata[row] for row in keep]
+            n_existing = len(index.image_metadata)
+            refit = bool(changed) or len(new_metadata) > refit_threshold * n_existing
+            mode = index.preprocess_mode
             
-            all_similarities.append(similarity_info)
+            # A refit re-reads existing images, which needs cached pixels or their originals
+            if refit and not self.can_reload(kept_metadata, mode):
+                console.print("[yellow]Original images not available, updating PCA incrementally instead of refitting")
+                refit = False
             
-            if similarity >= self.similarity_threshold:
-                matching_results.append(similarity_info)
+            if not new_metadata:
+                added = 0
+            elif refit:
+                console.print(f"[yellow]Appending {len(new_metadata)} images to {len(keep)} "
+                              f"({len(changed)} replaced), refitting PCA")
+                X_old, old_metadata = self.load_images(kept_metadata, mode=mode)
+                X_new, new_metadata = self.load_images(new_metadata, archive, progress, mode)
+                # Keep the component selection and storage the index was built with
+                settings = index.pca_summary or {}
+                self.fit_arrays(np.vstack([X_old, X_new]), old_metadata + new_metadata, progress,
+                                settings.get('variance_target'), settings.get('max_bytes_per_image'),
+                                index.feature_dtype, mode)
+                added = len(new_metadata)
+            else:
+                X_new, new_metadata = self.load_images(new_metadata, archive, progress, mode)
+                added = X_new.shape[0]
+                if added:
+                    progress("pca")
+                    # Replaced rows are dropped below but stay folded into the subspace statistics
+                    U_k, mean_vector, eigenvalues, total_variance, _ = self.pca_engine.update(
+                        index.U_k, index.mean_vector, index.pca_eigenvalues,
+                        index.pca_total_variance, n_existing, X_new
+                    )
+                    progress("projection")
+                    existing_features = self.pca_engine.reproject(
+                        index.feature_store.decode(keep), index.U_k, index.mean_vector, U_k, mean_vector
+                    )
+                    new_features = self.project(X_new, U_k, mean_vector)
+                    progress("index")
+                    summary = {**index.pca_summary, 'method': 'incremental',
+                               'explained_variance': self._explained_variance(eigenvalues, total_variance)}
+                    phash_index = PerceptualHashIndex(index.phash_index.hashes[keep])
+                    self.install_index(
+                        U_k, mean_vector, eigenvalues, total_variance, summary,
+                        np.vstack([existing_features, new_features]),
+                        phash_index.append(dhash_rows(X_new, self.target_size)),
+                        kept_metadata + new_metadata, index.feature_dtype, mode
+                    )
+        
+        timer.stop()
+        append_time = time.time() - start_time
+        self.load_time += append_time
+        replaced = len(changed) if added else 0
+        console.print(f"[bold green]Appended {added} images ({replaced} replaced) in {append_time:.2f} seconds")
+        return {'added': added, 'replaced': replaced, 'total': len(self.image_metadata), 'refit': refit,
+                'stages': timer.as_dict()}
+
+    def similarity_info(self, idx: int, similarity: float, index: ImageIndex = None) -> Dict:
+        """Result entry for one dataset image"""
+        metadata = self.current_index(index).image_metadata[idx]
+        return {
+            'song': metadata['song'],
+            'singer': metadata['singer'],
+            'genre': metadata['genre'],
+            'album': metadata['album'],
+            'similarity_percentage': round(float(similarity), 2)
+        }
+
+    @staticmethod
+    def top_indices(scores: np.ndarray, count: int) -> np.ndarray:
+        """Indices of the count highest scores in descending order, via a partition.
+
+        Rows are ranked by the rounded percentage with ties in dataset order, the
+        same key for selecting and for ordering, so top_indices(scores, n) is
+        always a prefix of top_indices(scores, n + 1) and pages never overlap.
+        """
+        count = min(count, len(scores))
+        if count <= 0:
+            return np.empty(0, dtype=np.intp)
+        rounded = np.round(scores, 2)
+        if count < len(scores):
+            # Everything above the count-th best value, then its ties by index
+            kth = -np.partition(-rounded, count - 1)[count - 1]
+            above = np.flatnonzero(rounded > kth)
+            tied = np.flatnonzero(rounded == kth)[:count - len(above)]
+            idx = np.concatenate([above, tied])
+        else:
+            idx = np.arange(len(scores))
+        return idx[np.lexsort((idx, -rounded[idx]))]
+
+    def rank_similarities(self, similarities: np.ndarray, similarity_threshold: float, top_k: int = None,
+                          offset: int = 0, limit: int = None, include_all: bool = False,
+                          indices: np.ndarray = None, index: ImageIndex = None) -> Dict:
+        """Rank similarity percentages and build result dicts only for the requested page.
+
+        Matches are the images whose rounded percentage, the value reported and
+        ranked by, is at or above the threshold, capped at top_k; the page is
+        matches[offset:offset + limit]. all_similarities (every image, sorted) is
+        only built when include_all is set. indices maps each similarity to its
+        dataset row when only a subset (ANN candidates) was scored.
+        """
+        index = self.current_index(index)
+        if indices is None:
+            indices = np.arange(len(similarities))
 
-        # Sort results by similarity
-        all_similarities.sort(key=lambda x: x['similarity_percentage'], reverse=True)
-        matching_results.sort(key=lambda x: x['similarity_percentage'], reverse=True)
+        matches_found = int(np.count_nonzero(np.round(similarities, 2) >= similarity_threshold))
+        if top_k is not None:
+            matches_found = min(matches_found, top_k)
+        end = matches_found if limit is None else min(matches_found, offset + limit)
         
-        self.processing_time = time.time() - start_time
+        page = self.top_indices(similarities, end)[offset:]
+        matching_results = [self.similarity_info(indices[idx], similarities[idx], index) for idx in page]
         
-        # Create result tables
+        best = int(self.top_indices(similarities, 1)[0]) if len(similarities) else None
         results = {
-            'matches_found': len(matching_results),
+            'matches_found': matches_found,
             'matching_results': matching_results,
-            'highest_similarity': all_similarities[0] if all_similarities else None,
-            'all_similarities': all_similarities,
-            'processing_metrics': {
-                'processing_time': self.processing_time,
-                'load_time': self.load_time
-            }
+            'highest_similarity': self.similarity_info(indices[best], similarities[best], index) if best is not None else None,
+            'page': {'offset': offset, 'limit': limit, 'total': matches_found},
         }
+        if include_all:
+            results['all_similarities'] = [
+                self.similarity_info(indices[idx], similarities[idx], index)
+                for idx in self.top_indices(similarities, len(similarities))
+            ]
+        return results
+
+    def search_similar_images(self, query_features: np.ndarray, top_k: int = None, offset: int = 0,
+                              limit: int = None, include_all: bool = False, exact: bool = False,
+                              nprobe: int = None, similarity_threshold: float = None,
+                              index: ImageIndex = None, timer: StageTimer = None) -> Dict:
+        """Search for similar images using Euclidean distance.
+
+        Uses the IVF index when one is built, unless exact is set; exact search
+        scans every image and serves as the recall baseline. similarity_threshold
+        defaults to the processor's; index to the installed snapshot. The
+        "distance" and "ranking" stages are recorded on timer.
+        """
+        start_time = time.time()
+        timer = StageTimer() if timer is None else timer
+        index = self.current_index(index)
+        similarity_threshold = self.similarity_threshold if similarity_threshold is None else similarity_threshold
+
+        # Calculate similarities
+        with timer.stage("distance"):
+            if index.ann_index is not None and not exact:
+                indices, similarities = self.calculate_candidate_similarities(query_features, nprobe, index)
+            else:
+                indices, similarities = None, self.calculate_similarity_percentage(query_features, index)
         
-        # Print formatted results
-        console.print("\n")
-        console.print(self.create_results_table(results))
-        console.print("\n")
-        console.print(self.create_matches_table(matching_results))
-        console.print("\n")
+        # Process results
+        with timer.stage("ranking"):
+            results = self.rank_similarities(similarities, similarity_threshold, top_k, offset, limit,
+                                             include_all, indices, index)
+        results['search_mode'] = 'exact' if indices is None else 'ivf'
+        
+        processing_time = time.time() - start_time
+        self.processing_time = processing_time
+        
+        results['processing_metrics'] = {
+            'processing_time': processing_time,
+            'load_time': self.load_time,
+            'stages': timer.as_dict()
+        }
+        
+        self.search_log.detail(lambda: (self.create_results_table(results),
+                                        self.create_matches_table(results['matching_results'])))
         
         return results
+
+    def search_image_bytes(self, contents: bytes, top_k: int = None, offset: int = 0, limit: int = None,
+                           include_all: bool = False, exact: bool = False, nprobe: int = None,
+                           similarity_threshold: float = None) -> Dict:
+        """Search with an encoded query image, reusing cached projections and results.
+
+        Entries are keyed by a hash of the bytes plus the index version, so a new
+        index never serves stale results; the ranked result additionally depends
+        on the threshold and paging parameters. The whole search runs against the
+        snapshot installed when it starts.
+        """
+        start_time = time.time()
+        timer = StageTimer()
+        index = self.current_index()
+        similarity_threshold = self.similarity_threshold if similarity_threshold is None else similarity_threshold
+        with timer.stage("cache"):
+            content_hash = self.query_cache.content_hash(contents)
+            result_key = ('result', content_hash, index.version, similarity_threshold,
+                          top_k, offset, limit, include_all, exact, nprobe)
+            results = self.query_cache.get(result_key)
+        
+        if results is not None:
+            processing_time = time.time() - start_time
+            self.processing_time = processing_time
+            self.search_log.event('image_search', mode=results['search_mode'], cache='hit',
+                                  matches=results['matches_found'], index_version=index.version,
+                                  processing_time=processing_time)
+            return {**results, 'processing_metrics': {
+                'processing_time': processing_time,
+                'load_time': self.load_time,
+                'cache': 'hit',
+                'stages': timer.as_dict()
+            }}
+        
+        processed_query = None
+        results = None
+        # Exact and near-duplicate covers may be answered from the hash index alone
+        if self.hash_can_answer(top_k, index):
+            hash_key = ('phash', content_hash, index.version)
+            query_hash = self.query_cache.get(hash_key)
+            if query_hash is None:
+                processed_query = self.preprocess_bytes(contents, index, timer)
+                if processed_query is None:
+                    raise ValueError("Invalid image file")
+                with timer.stage("hash"):
+                    query_hash = int(dhash_rows(processed_query[None, :], self.target_size)[0])
+                self.query_cache.put(hash_key, query_hash)
+            results = self.search_by_hash(query_hash, top_k, offset, limit, similarity_threshold, index, timer)
+        
+        if results is None:
+            projection_key = ('projection', content_hash, index.version)
+            query_features = self.query_cache.get(projection_key)
+            if query_features is None:
+                if processed_query is None:
+                    processed_query = self.preprocess_bytes(contents, index, timer)
+                    if processed_query is None:
+                        raise ValueError("Invalid image file")
+                with timer.stage("projection"):
+                    query_features = self.project_query(processed_query, index)
+                self.query_cache.put(projection_key, query_features)
+            results = self.search_similar_images(query_features, top_k, offset, limit, include_all, exact,
+                                                 nprobe, similarity_threshold, index, timer)
+        
+        self.query_cache.put(result_key, results)
+        processing_time = time.time() - start_time
+        self.processing_time = processing_time
+        results = {**results, 'processing_metrics': {**results['processing_metrics'], 'cache': 'miss',
+                                                     'processing_time': processing_time,
+                                                     'stages': timer.as_dict()}}
+        self.search_log.event('image_search', mode=results['search_mode'], cache='miss',
+                              matches=results['matches_found'], index_version=index.version,
+                              processing_time=processing_time, stages=timer.as_dict())
+        return results
+
+    def hash_can_answer(self, top_k: int = None, index: ImageIndex = None) -> bool:
+        """Whether search_by_hash may short-circuit a query.
+
+        Only a top_k query can be answered from hash hits alone: without it the
+        response must count and page every image above the threshold, which
+        only the PCA search sees.
+        """
+        index = self.current_index(index)
+        return self.phash_radius is not None and index.phash_index is not None and top_k is not None
+
+    def search_by_hash(self, query_hash: int, top_k: int = None, offset: int = 0, limit: int = None,
+                       similarity_threshold: float = None, index: ImageIndex = None,
+                       timer: StageTimer = None) -> Dict:
+        """Answer a top_k query from the perceptual-hash index.
+
+        Succeeds only when at least top_k images within phash_radius bits reach
+        the threshold, so matches_found and the page are exactly what a top_k
+        search returns; None means fall through to the PCA search.
+        """
+        index = self.current_index(index)
+        if not self.hash_can_answer(top_k, index):
+            return None
+        start_time = time.time()
+        timer = StageTimer() if timer is None else timer
+        similarity_threshold = self.similarity_threshold if similarity_threshold is None else similarity_threshold
+        
+        with timer.stage("distance"):
+            rows, hamming = index.phash_index.lookup(query_hash, self.phash_radius)
+        if len(rows) == 0:
+            return None
+        similarities = 100 * (1 - hamming / 64)
+        with timer.stage("ranking"):
+            results = self.rank_similarities(similarities, similarity_threshold, top_k, offset, limit,
+                                             indices=rows, index=index)
+        if results['matches_found'] < top_k:
+            return None
+        
+        processing_time = time.time() - start_time
+        self.processing_time = processing_time
+        results['search_mode'] = 'phash'
+        results['processing_metrics'] = {
+            'processing_time': processing_time,
+            'load_time': self.load_time,
+            'stages': timer.as_dict()
+        }
+        return results
+
+    def search_similar_images_batch(self, query_features: np.ndarray, top_k: int = None, offset: int = 0,
+                                    limit: int = None, similarity_threshold: float = None,
+                                    index: ImageIndex = None, timer: StageTimer = None) -> List[Dict]:
+        """Search for many projected queries at once (B x k), one result dict per query"""
+        start_time = time.time()
+        timer = StageTimer() if timer is None else timer
+        index = self.current_index(index)
+        similarity_threshold = self.similarity_threshold if similarity_threshold is None else similarity_threshold
+        
+        with timer.stage("distance"):
+            similarity_matrix = self.calculate_similarity_matrix(query_features, index)
+        with timer.stage("ranking"):
+            batch_results = [
+                self.rank_similarities(similarities, similarity_threshold, top_k, offset, limit, index=index)
+                for similarities in similarity_matrix
+            ]
+        
+        processing_time = time.time() - start_time
+        self.processing_time = processing_time
+        self.search_log.event('image_search_batch', queries=len(batch_results), index_version=index.version,
+                              processing_time=processing_time)
+        return batch_results
     
+    def measure_recall(self, query_features: np.ndarray, top_k: int = 10, nprobe: int = None,
+                       index: ImageIndex = None) -> float:
+        """Recall@top_k of the IVF index against exact search for a batch of projected queries"""
+        index = self.current_index(index)
+        if index.ann_index is None:
+            return 1.0
+        hits = 0
+        for query in np.atleast_2d(query_features):
+            exact = self.top_indices(self.calculate_similarity_percentage(query, index), top_k)
+            indices, similarities = self.calculate_candidate_similarities(query, nprobe, index)
+            approximate = indices[self.top_indices(similarities, top_k)]
+            hits += len(np.intersect1d(exact, approximate))
+        return hits / (len(np.atleast_2d(query_features)) * min(top_k, len(index)))
+
+    def save_index(self, index_dir) -> None:
+        """Persist the fitted index so a restarted server can reopen it without re-fitting"""
+        index = self.current_index()
+        
+        arrays = {
+            'U_k': index.U_k,
+            'mean_vector': index.mean_vector,
+            'pca_eigenvalues': index.pca_eigenvalues,
+            **index.feature_store.to_arrays(),
+            'phashes': index.phash_index.hashes,
+        }
+        if index.ann_index is not None:
+            arrays.update(index.ann_index.to_arrays())
+        info = {
+            'target_size': list(self.target_size),
+            'n_images': len(index),
+            'k': int(index.U_k.shape[1]),
+            'feature_dtype': index.feature_store.dtype,
+            'preprocess_mode': index.preprocess_mode,
+            'pca_total_variance': index.pca_total_variance,
+            'explained_variance': index.explained_variance,
+            'pca_summary': index.pca_summary,
+            'load_time': self.load_time,
+        }
+        ImageIndexStore(index_dir).save(arrays, index.image_metadata, info)
+        console.print(f"[green]Image index saved to {index_dir}")
+
+    def load_index(self, index_dir, mmap: bool = True) -> bool:
+        """Open a saved index, memory-mapped by default; returns False if none exists"""
+        store = ImageIndexStore(index_dir)
+        if not store.exists():
+            return False
+        
+        start_time = time.time()
+        arrays, image_metadata, info = store.load(mmap=mmap)
+        if tuple(info['target_size']) != tuple(self.target_size):
+            raise ValueError(f"Saved index uses target size {info['target_size']}, processor uses {self.target_size}")
+        
+        feature_store = FeatureStore.from_arrays(arrays, info['feature_dtype'])
+        if self.ann is not None and 'ivf_centroids' in arrays:
+            ann_index = IVFIndex.from_arrays(arrays, nprobe=self.ann_nprobe)
+        else:
+            ann_index = self.build_ann_index(feature_store.decode())
+        
+        self.load_time = info['load_time']
+        self.swap_index(ImageIndex(
+            arrays['U_k'], arrays['mean_vector'], arrays['pca_eigenvalues'], info['pca_total_variance'],
+            info.get('pca_summary'), feature_store, PerceptualHashIndex(arrays['phashes']), ann_index,
+            image_metadata, info['preprocess_mode'], self.index_version + 1
+        ))
+        
+        console.print(f"[bold green]Image index with {len(image_metadata)} images opened in {time.time() - start_time:.3f} seconds")
+        return True
+
     def cleanup(self):
         self.dataset_loader.cleanup()
\ No newline at end of file
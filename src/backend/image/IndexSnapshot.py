@@ -0,0 +1,58 @@
+from typing import Dict, List
+import numpy as np
+from image.AnnIndex import IVFIndex
+from image.FeatureStore import FeatureStore
+from image.PerceptualHash import PerceptualHashIndex
+
+
+class ImageIndex:
+    """Immutable snapshot of a fitted image index.
+
+    The processor holds one snapshot and replaces it with a single assignment.
+    A search reads processor.index once and uses that object throughout, so it
+    sees a consistent basis, projections and metadata even while a reload swaps
+    in a new snapshot. Nothing here is modified after construction; appends build
+    a new snapshot.
+    """
+
+    __slots__ = ('U_k', 'mean_vector', 'pca_eigenvalues', 'pca_total_variance', 'explained_variance',
+                 'pca_summary', 'feature_store', 'phash_index', 'ann_index', 'image_metadata',
+                 'preprocess_mode', 'version')
+
+    def __init__(self, U_k: np.ndarray, mean_vector: np.ndarray, pca_eigenvalues: np.ndarray,
+                 pca_total_variance: float, pca_summary: Dict, feature_store: FeatureStore,
+                 phash_index: PerceptualHashIndex, ann_index: IVFIndex, image_metadata: List[Dict],
+                 preprocess_mode: str, version: int):
+        values = {
+            'U_k': U_k,
+            'mean_vector': mean_vector,
+            'pca_eigenvalues': pca_eigenvalues,
+            'pca_total_variance': pca_total_variance,
+            'explained_variance': (float(pca_eigenvalues.sum() / pca_total_variance * 100)
+                                   if pca_total_variance > 0 else 100.0),
+            'pca_summary': pca_summary,
+            'feature_store': feature_store,
+            'phash_index': phash_index,
+            'ann_index': ann_index,
+            'image_metadata': image_metadata,
+            'preprocess_mode': preprocess_mode,
+            'version': version,
+        }
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ImageIndex snapshots are immutable; install a new one instead")
+
+    def __len__(self) -> int:
+        return len(self.image_metadata)
+
+    @property
+    def feature_dtype(self) -> str:
+        """Representation the projections are stored in; appends and refits keep it"""
+        return self.feature_store.dtype
+
+    @property
+    def dataset_features(self) -> np.ndarray:
+        """PCA projections of the dataset, dequantized from the feature store"""
+        return self.feature_store.decode()
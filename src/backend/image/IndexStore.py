@@ -0,0 +1,114 @@
+import json
+import os
+import re
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+import numpy as np
+
+
+class ImageIndexStore:
+    """Versioned on-disk layout for a fitted image index.
+
+    <index_dir>/
+        CURRENT              name of the version directory to load
+        <version>/
+            manifest.json    format version, array names and index settings
+            metadata.json    image metadata, one entry per row of dataset_features
+            <name>.npy       one file per array, openable with np.load(mmap_mode='r')
+
+    Each save writes a new version directory and then atomically replaces
+    CURRENT, so a crash at any point leaves either the previous or the new index
+    loadable; versions CURRENT no longer names are removed afterwards. An index
+    saved before versioning (the files directly in index_dir) is still loaded.
+    """
+
+    FORMAT_VERSION = 2
+    MANIFEST = "manifest.json"
+    METADATA = "metadata.json"
+    POINTER = "CURRENT"
+    VERSION_PATTERN = re.compile(r"v\d+-\d+")
+
+    def __init__(self, index_dir):
+        self.index_dir = Path(index_dir)
+
+    def current_dir(self) -> Path:
+        """Directory of the version CURRENT names, or index_dir itself for an unversioned index"""
+        try:
+            version = (self.index_dir / self.POINTER).read_text().strip()
+        except FileNotFoundError:
+            return self.index_dir
+        return self.index_dir / version
+
+    def exists(self) -> bool:
+        return (self.current_dir() / self.MANIFEST).exists()
+
+    @staticmethod
+    def _write_synced(path: Path, write) -> None:
+        """Write a file through write(f) and flush it to disk before CURRENT can name it"""
+        with open(path, 'wb') as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def save(self, arrays: Dict[str, np.ndarray], metadata: List[Dict], info: Dict) -> None:
+        """Write arrays, metadata and settings as a new version and switch CURRENT to it"""
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        version = f"v{time.time_ns()}-{os.getpid()}"
+        version_dir = self.index_dir / version
+        version_dir.mkdir()
+
+        for name, array in arrays.items():
+            self._write_synced(version_dir / f"{name}.npy",
+                               lambda f: np.save(f, np.ascontiguousarray(array), allow_pickle=False))
+
+        self._write_synced(version_dir / self.METADATA, lambda f: f.write(json.dumps(metadata).encode()))
+
+        manifest = {
+            "format_version": self.FORMAT_VERSION,
+            "created_at": time.time(),
+            "arrays": sorted(arrays),
+            "info": info,
+        }
+        self._write_synced(version_dir / self.MANIFEST, lambda f: f.write(json.dumps(manifest, indent=2).encode()))
+
+        pointer_tmp = self.index_dir / f"{self.POINTER}.tmp-{os.getpid()}"
+        self._write_synced(pointer_tmp, lambda f: f.write(version.encode()))
+        os.replace(pointer_tmp, self.index_dir / self.POINTER)
+        dir_fd = os.open(self.index_dir, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+        # Drop older versions, half-written ones from crashed saves and unversioned files
+        for entry in self.index_dir.iterdir():
+            if entry.name == version:
+                continue
+            if entry.is_dir() and self.VERSION_PATTERN.fullmatch(entry.name):
+                shutil.rmtree(entry, ignore_errors=True)
+            elif entry.name in (self.MANIFEST, self.METADATA) or entry.suffix == ".npy" \
+                    or entry.name.startswith(f"{self.POINTER}.tmp-"):
+                entry.unlink(missing_ok=True)
+
+    def load(self, mmap: bool = True) -> Tuple[Dict[str, np.ndarray], List[Dict], Dict]:
+        """Open a saved index; arrays are memory-mapped read-only when mmap is set"""
+        index_dir = self.current_dir()
+        with open(index_dir / self.MANIFEST, 'r') as f:
+            manifest = json.load(f)
+
+        version = manifest.get("format_version")
+        if version != self.FORMAT_VERSION:
+            raise ValueError(f"Unsupported image index format version {version}, expected {self.FORMAT_VERSION}")
+
+        mmap_mode = 'r' if mmap else None
+        arrays = {
+            name: np.load(index_dir / f"{name}.npy", mmap_mode=mmap_mode, allow_pickle=False)
+            for name in manifest["arrays"]
+        }
+
+        with open(index_dir / self.METADATA, 'r') as f:
+            metadata = json.load(f)
+
+        return arrays, metadata, manifest["info"]
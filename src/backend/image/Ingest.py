@@ -0,0 +1,271 @@
+import hashlib
+import io
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from typing import Callable, FrozenSet, List, Optional, Tuple
+import cv2
+import numpy as np
+from PIL import Image
+from StageTimer import StageTimer
+
+PREPROCESS_MODES = ("pil", "fast")
+
+# Reduced grayscale decode flags by downscale factor (JPEG scales in the DCT)
+REDUCED_GRAYSCALE_FLAGS = {
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    1: cv2.IMREAD_GRAYSCALE,
+}
+
+
+def preprocess_pixels(image, target_size: Tuple[int, int], mode: str = "pil") -> np.ndarray:
+    """Convert an already decoded image to grayscale, resize, and flatten"""
+    if mode == "fast":
+        if len(image.shape) == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        return cv2.resize(image, target_size, interpolation=cv2.INTER_AREA).flatten()
+
+    # Convert to PIL Image if not already
+    if not isinstance(image, Image.Image):
+        # If it's a numpy array with 3 channels, convert to grayscale
+        if len(image.shape) == 3:
+            image = Image.fromarray(image).convert('L')
+        else:
+            image = Image.fromarray(image)
+
+    # Resize the image
+    resized = image.resize(target_size, Image.LANCZOS)
+
+    # Convert to numpy array and flatten
+    return np.array(resized).flatten()
+
+
+def reduction_factor(data: bytes, target_size: Tuple[int, int]) -> int:
+    """Largest decode downscale (1, 2, 4 or 8) that keeps the image at least target_size.
+
+    Only the header is parsed to get the source size.
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as header:
+            width, height = header.size
+    except Exception:
+        return 1
+    for factor in (8, 4, 2):
+        if width // factor >= target_size[0] and height // factor >= target_size[1]:
+            return factor
+    return 1
+
+
+def decode_fast(data: bytes, target_size: Tuple[int, int]):
+    """Decode straight to grayscale at reduced resolution and finish with an area resize"""
+    image = decode_image(data, target_size, "fast")
+    if image is None:
+        return None
+    return preprocess_pixels(image, target_size, "fast")
+
+
+def decode_image(data: bytes, target_size: Tuple[int, int], mode: str = "pil"):
+    """Decode step alone: reduced grayscale for "fast", full BGR for "pil"; None if invalid"""
+    buffer = np.frombuffer(data, np.uint8)
+    if mode == "fast":
+        return cv2.imdecode(buffer, REDUCED_GRAYSCALE_FLAGS[reduction_factor(data, target_size)])
+    return cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+
+
+def decode_pixels(data: bytes, target_size: Tuple[int, int], mode: str = "pil"):
+    """Decode and preprocess encoded image bytes, None if they cannot be decoded"""
+    image = decode_image(data, target_size, mode)
+    if image is None:
+        return None
+    return preprocess_pixels(image, target_size, mode)
+
+
+def timed_decode_pixels(data: bytes, target_size: Tuple[int, int], mode: str = "pil"):
+    """decode_pixels plus the seconds spent in its "decode" and "preprocess" stages"""
+    timer = StageTimer()
+    with timer.stage("decode"):
+        image = decode_image(data, target_size, mode)
+    if image is None:
+        return None, timer.as_dict()
+    with timer.stage("preprocess"):
+        pixels = preprocess_pixels(image, target_size, mode)
+    return pixels, timer.as_dict()
+
+
+def load_pixels(path: str, target_size: Tuple[int, int], mode: str = "pil"):
+    """Read and preprocess one image file, None if it cannot be decoded"""
+    if mode == "fast":
+        try:
+            with open(path, 'rb') as f:
+                return decode_fast(f.read(), target_size)
+        except OSError:
+            return None
+    image = cv2.imread(path)
+    if image is None:
+        return None
+    return preprocess_pixels(image, target_size)
+
+
+def write_members(archive: str, members: List[str], write_dir: str) -> None:
+    """Copy zip members into write_dir by basename, skipping ones already there"""
+    with zipfile.ZipFile(archive, 'r') as zip_ref:
+        for member in members:
+            target = os.path.join(write_dir, os.path.basename(member))
+            if not os.path.exists(target):
+                with open(target, 'wb') as f:
+                    f.write(zip_ref.read(member))
+
+
+def read_source(source: str, zip_ref: zipfile.ZipFile = None) -> Optional[bytes]:
+    """Encoded bytes of a file path, or of a zip member when zip_ref is given; None if unreadable"""
+    try:
+        if zip_ref is not None:
+            return zip_ref.read(source)
+        with open(source, 'rb') as f:
+            return f.read()
+    except (KeyError, OSError):
+        return None
+
+
+def _preprocess_sources(X: np.ndarray, start: int, sources: List[str], target_size: Tuple[int, int],
+                        archive: str = None, write_dir: str = None, mode: str = "pil", hash_keys: bool = False,
+                        skip_keys: FrozenSet[str] = frozenset()) -> Tuple[List[bool], List[Optional[str]]]:
+    """Preprocess a run of sources into rows X[start:]; sources are file paths or,
+    with archive set, member names read straight from that zip.
+
+    With hash_keys the sha256 of each source's bytes is computed from the same
+    read and returned; sources whose hash is in skip_keys are not decoded and
+    count as not loaded, their rows being cached elsewhere. Returns (loaded, keys).
+    """
+    if archive is None and not hash_keys:
+        loaded = []
+        for offset, path in enumerate(sources):
+            row = load_pixels(path, target_size, mode)
+            if row is not None:
+                X[start + offset] = row
+            loaded.append(row is not None)
+        return loaded, [None] * len(sources)
+
+    loaded = []
+    keys = []
+    zip_ref = zipfile.ZipFile(archive, 'r') if archive is not None else None
+    try:
+        for offset, source in enumerate(sources):
+            data = read_source(source, zip_ref)
+            key = hashlib.sha256(data).hexdigest() if hash_keys and data is not None else None
+            keys.append(key)
+            if data is None or key in skip_keys:
+                row = None
+            else:
+                row = decode_pixels(data, target_size, mode)
+                if row is not None:
+                    X[start + offset] = row
+            loaded.append(row is not None)
+            # Keep the original only if the front-end will need to display it
+            if write_dir is not None and (row is not None or key in skip_keys):
+                with open(os.path.join(write_dir, os.path.basename(source)), 'wb') as f:
+                    f.write(data)
+    finally:
+        if zip_ref is not None:
+            zip_ref.close()
+    return loaded, keys
+
+
+# Hashes of rows that are already cached, installed once per worker process
+_worker_skip_keys = frozenset()
+
+
+def _init_worker(skip_keys: FrozenSet[str]) -> None:
+    global _worker_skip_keys
+    _worker_skip_keys = skip_keys
+
+
+def _preprocess_chunk(shm_name: str, shape: Tuple[int, int], start: int, sources: List[str],
+                      target_size: Tuple[int, int], archive: str = None, write_dir: str = None,
+                      mode: str = "pil", hash_keys: bool = False) -> Tuple[int, List[bool], List[Optional[str]]]:
+    """Worker: preprocess a run of images straight into rows of the shared matrix"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        X = np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+        loaded, keys = _preprocess_sources(X, start, sources, target_size, archive, write_dir, mode,
+                                           hash_keys, _worker_skip_keys)
+        del X
+        return start, loaded, keys
+    finally:
+        shm.close()
+
+
+def preprocess_images(paths: List[str], target_size: Tuple[int, int], num_workers: int = None,
+                      chunk_size: int = 64, progress: Callable[[int, int], None] = None,
+                      archive: str = None, write_dir: str = None, mode: str = "pil", hash_keys: bool = False,
+                      skip_keys: FrozenSet[str] = frozenset()) -> Tuple[np.ndarray, np.ndarray, List[Optional[str]]]:
+    """Decode and preprocess images into a float32 (N x D) matrix.
+
+    paths are image files, or member names inside the zip at archive when it is
+    given; members are then decoded from memory and only written to write_dir
+    (if set) for display, never extracted as an intermediate step. mode selects
+    the PIL LANCZOS pipeline ("pil") or reduced grayscale decode ("fast").
+
+    Work is split into chunks of chunk_size paths and spread over a process pool
+    of num_workers (default: all cores); each worker writes its rows directly into
+    a shared preallocated matrix.
+
+    With hash_keys each worker also hashes the bytes it read (sha256), so a pixel
+    cache can be keyed without a second read; paths whose hash is in skip_keys
+    are already cached and are not decoded (their originals are still written).
+    Returns (X, loaded, keys) where loaded flags the paths whose image was decoded,
+    X holds only those rows in input order and keys are the hashes (None when
+    not hashed or unreadable).
+    """
+    n_images = len(paths)
+    n_features = target_size[0] * target_size[1]
+    num_workers = num_workers or os.cpu_count() or 1
+
+    if num_workers <= 1 or n_images <= chunk_size:
+        X = np.zeros((n_images, n_features), dtype=np.float32)
+        loaded = np.zeros(n_images, dtype=bool)
+        keys = []
+        for start in range(0, n_images, chunk_size):
+            chunk = paths[start:start + chunk_size]
+            chunk_loaded, chunk_keys = _preprocess_sources(X, start, chunk, target_size, archive, write_dir, mode,
+                                                           hash_keys, skip_keys)
+            loaded[start:start + len(chunk)] = chunk_loaded
+            keys.extend(chunk_keys)
+            if progress:
+                progress(start + len(chunk), n_images)
+        return (X if loaded.all() else X[loaded]), loaded, keys
+
+    shape = (n_images, n_features)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, n_images * n_features * 4))
+    try:
+        X_shared = np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+        X_shared.fill(0)
+        loaded = np.zeros(n_images, dtype=bool)
+        keys = [None] * n_images
+        done = 0
+
+        # skip_keys can be large, so it is sent once per worker rather than per chunk
+        with ProcessPoolExecutor(max_workers=min(num_workers, -(-n_images // chunk_size)),
+                                 initializer=_init_worker, initargs=(frozenset(skip_keys),)) as executor:
+            futures = [
+                executor.submit(_preprocess_chunk, shm.name, shape, start,
+                                paths[start:start + chunk_size], target_size, archive, write_dir, mode, hash_keys)
+                for start in range(0, n_images, chunk_size)
+            ]
+            for future in as_completed(futures):
+                start, chunk_loaded, chunk_keys = future.result()
+                loaded[start:start + len(chunk_loaded)] = chunk_loaded
+                keys[start:start + len(chunk_keys)] = chunk_keys
+                done += len(chunk_loaded)
+                if progress:
+                    progress(done, n_images)
+
+        X = X_shared.copy() if loaded.all() else X_shared[loaded]
+        del X_shared
+        return X, loaded, keys
+    finally:
+        shm.close()
+        shm.unlink()
@@ -0,0 +1,215 @@
+from typing import Tuple
+import numpy as np
+
+
+class PCAEngine:
+    """Principal component solver that picks its algorithm from the data shape.
+
+    Methods:
+        "covariance": eigendecomposition of the D x D covariance matrix (reference)
+        "gram":       eigendecomposition of the N x N Gram matrix, for N < D
+        "svd":        thin SVD of the centered data matrix
+        "randomized": randomized truncated SVD, for large N and small k
+        "auto":       gram when N <= D, randomized when k is small, svd otherwise
+    """
+
+    METHODS = ("auto", "covariance", "gram", "svd", "randomized")
+
+    def __init__(self, method: str = "auto", oversamples: int = 10, n_iter: int = 4, random_state: int = 0,
+                 chunk_size: int = 4096):
+        if method not in self.METHODS:
+            raise ValueError(f"Unknown PCA method '{method}', expected one of {self.METHODS}")
+        self.method = method
+        self.oversamples = oversamples
+        self.n_iter = n_iter
+        self.random_state = random_state
+        self.chunk_size = chunk_size
+
+    def select_method(self, n_samples: int, n_features: int, k: int) -> str:
+        """Pick the cheapest solver for an N x D matrix and k components"""
+        if self.method != "auto":
+            return self.method
+        if n_samples <= n_features:
+            return "gram"
+        if k + self.oversamples < n_features // 4:
+            return "randomized"
+        return "svd"
+
+    def fit(self, X: np.ndarray, k: int, method: str = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray, float, str]:
+        """Fit k principal components of X.
+
+        Returns (U_k, mean_vector, eigenvalues, total_variance, method) where
+        U_k is D x k, eigenvalues are the covariance eigenvalues of the returned
+        components in descending order and total_variance is the trace of the
+        covariance matrix.
+
+        X is never promoted or centered as a whole: the mean, variance and the
+        products each solver needs are accumulated in float64 over centered
+        blocks of chunk_size rows, like project(). Only "svd" factors the
+        centered matrix itself, which it builds in X's precision.
+        """
+        n_samples, n_features = X.shape
+        if n_samples == 0:
+            raise ValueError("Cannot compute PCA on an empty dataset")
+
+        mean_vector = np.zeros(n_features)
+        for start in range(0, n_samples, self.chunk_size):
+            mean_vector += np.sum(X[start:start + self.chunk_size], axis=0, dtype=np.float64)
+        mean_vector /= n_samples
+        total_variance = float(sum(np.sum(chunk ** 2) for _, chunk in self._centered_chunks(X, mean_vector))
+                               / n_samples)
+
+        k = max(1, min(k, n_samples, n_features))
+        method = method or self.select_method(n_samples, n_features, k)
+
+        if method == "covariance":
+            U_k, eigenvalues = self._fit_covariance(X, mean_vector, k)
+        elif method == "gram":
+            U_k, eigenvalues = self._fit_gram(X, mean_vector, k)
+        elif method == "svd":
+            U_k, eigenvalues = self._fit_svd(X, mean_vector, k)
+        elif method == "randomized":
+            U_k, eigenvalues = self._fit_randomized(X, mean_vector, k)
+        else:
+            raise ValueError(f"Unknown PCA method '{method}', expected one of {self.METHODS}")
+
+        return self._fix_signs(U_k), mean_vector, eigenvalues, total_variance, method
+
+    def _centered_chunks(self, X: np.ndarray, mean_vector: np.ndarray):
+        """(start, X[rows] - mean) for consecutive blocks of chunk_size rows, in float64"""
+        for start in range(0, X.shape[0], self.chunk_size):
+            yield start, X[start:start + self.chunk_size] - mean_vector
+
+    def _centered_dot(self, X: np.ndarray, mean_vector: np.ndarray, M: np.ndarray) -> np.ndarray:
+        """(X - mean)M without materialising X - mean"""
+        product = np.empty((X.shape[0], M.shape[1]))
+        for start, chunk in self._centered_chunks(X, mean_vector):
+            product[start:start + len(chunk)] = np.dot(chunk, M)
+        return product
+
+    def _centered_tdot(self, X: np.ndarray, mean_vector: np.ndarray, M: np.ndarray) -> np.ndarray:
+        """(X - mean)'M without materialising X - mean"""
+        product = np.zeros((X.shape[1], M.shape[1]))
+        for start, chunk in self._centered_chunks(X, mean_vector):
+            product += np.dot(chunk.T, M[start:start + len(chunk)])
+        return product
+
+    def _fit_covariance(self, X: np.ndarray, mean_vector: np.ndarray, k: int):
+        """Eigenvectors of C = (1/N)X'X, O(N*D^2 + D^3)"""
+        n_samples, n_features = X.shape
+        C = np.zeros((n_features, n_features))
+        for _, chunk in self._centered_chunks(X, mean_vector):
+            C += np.dot(chunk.T, chunk)
+        C /= n_samples
+        eigenvalues, eigenvectors = np.linalg.eigh(C)
+
+        idx = eigenvalues.argsort()[::-1][:k]
+        return eigenvectors[:, idx], np.clip(eigenvalues[idx], 0, None)
+
+    def _fit_gram(self, X: np.ndarray, mean_vector: np.ndarray, k: int):
+        """Eigenvectors of G = XX' mapped back to feature space, O(N^2*D + N^3)"""
+        n_samples, n_features = X.shape
+        # G sums over features, so accumulate it over column blocks of the same size as a row chunk
+        width = max(1, self.chunk_size * n_features // n_samples)
+        G = np.zeros((n_samples, n_samples))
+        for start in range(0, n_features, width):
+            block = X[:, start:start + width] - mean_vector[start:start + width]
+            G += np.dot(block, block.T)
+        eigenvalues, eigenvectors = np.linalg.eigh(G)
+
+        idx = eigenvalues.argsort()[::-1][:k]
+        eigenvalues = np.clip(eigenvalues[idx], 0, None)
+        eigenvectors = eigenvectors[:, idx]
+
+        # u_i = X'v_i / sqrt(lambda_i); drop directions with no variance
+        keep = eigenvalues > eigenvalues.max(initial=0) * 1e-12
+        U_k = np.zeros((n_features, k))
+        U_k[:, keep] = self._centered_tdot(X, mean_vector, eigenvectors[:, keep]) / np.sqrt(eigenvalues[keep])
+        return U_k, eigenvalues / n_samples
+
+    def _fit_svd(self, X: np.ndarray, mean_vector: np.ndarray, k: int):
+        """Thin SVD X = USV', O(N*D*min(N, D))"""
+        n_samples = X.shape[0]
+        dtype = X.dtype if np.issubdtype(X.dtype, np.floating) else np.float64
+        X_centered = np.empty(X.shape, dtype=dtype)
+        for start, chunk in self._centered_chunks(X, mean_vector):
+            X_centered[start:start + len(chunk)] = chunk
+        _, S, Vt = np.linalg.svd(X_centered, full_matrices=False)
+        S, Vt = S.astype(np.float64), Vt.astype(np.float64)
+        return Vt[:k].T, (S[:k] ** 2) / n_samples
+
+    def _fit_randomized(self, X: np.ndarray, mean_vector: np.ndarray, k: int):
+        """Randomized range finder with power iterations (Halko et al.), O(N*D*k)"""
+        n_samples, n_features = X.shape
+        n_random = min(k + self.oversamples, n_samples, n_features)
+        rng = np.random.default_rng(self.random_state)
+
+        Q = self._centered_dot(X, mean_vector, rng.standard_normal((n_features, n_random)))
+        Q, _ = np.linalg.qr(Q)
+        for _ in range(self.n_iter):
+            Q, _ = np.linalg.qr(self._centered_tdot(X, mean_vector, Q))
+            Q, _ = np.linalg.qr(self._centered_dot(X, mean_vector, Q))
+
+        B = self._centered_tdot(X, mean_vector, Q).T
+        _, S, Vt = np.linalg.svd(B, full_matrices=False)
+        return Vt[:k].T, (S[:k] ** 2) / n_samples
+
+    @staticmethod
+    def _fix_signs(U_k: np.ndarray) -> np.ndarray:
+        """Make the largest-magnitude entry of every component positive so all methods agree"""
+        if U_k.size == 0:
+            return U_k
+        pivots = np.argmax(np.abs(U_k), axis=0)
+        signs = np.sign(U_k[pivots, np.arange(U_k.shape[1])])
+        signs[signs == 0] = 1
+        return U_k * signs
+
+    def update(self, U_k: np.ndarray, mean_vector: np.ndarray, eigenvalues: np.ndarray,
+               total_variance: float, n_samples_seen: int, X_new: np.ndarray,
+               batch_size: int = 512) -> Tuple[np.ndarray, np.ndarray, np.ndarray, float, int]:
+        """Incrementally fold new rows into a fitted subspace (Ross et al. incremental PCA).
+
+        Only the k retained components are carried forward, so the cost per batch is
+        an SVD of a (k + batch + 1) x D matrix. Returns the updated
+        (U_k, mean_vector, eigenvalues, total_variance, n_samples_seen).
+        """
+        k = U_k.shape[1]
+
+        # Batches are promoted to float64 one at a time, never X_new as a whole
+        for start in range(0, X_new.shape[0], batch_size):
+            batch = np.asarray(X_new[start:start + batch_size], dtype=np.float64)
+            n_batch = batch.shape[0]
+            n_total = n_samples_seen + n_batch
+
+            batch_mean = np.mean(batch, axis=0)
+            mean_total = (n_samples_seen * mean_vector + n_batch * batch_mean) / n_total
+            mean_correction = np.sqrt(n_samples_seen * n_batch / n_total) * (mean_vector - batch_mean)
+            batch_centered = batch - batch_mean
+
+            # Stack the old subspace scaled by its singular values, the centered batch
+            # and the mean shift, then re-diagonalise
+            singular_values = np.sqrt(eigenvalues * n_samples_seen)
+            stacked = np.vstack([singular_values[:, None] * U_k.T, batch_centered, mean_correction])
+            _, S, Vt = np.linalg.svd(stacked, full_matrices=False)
+
+            total_ss = (total_variance * n_samples_seen + np.sum(batch_centered ** 2)
+                        + np.sum(mean_correction ** 2))
+
+            U_k = self._fix_signs(Vt[:k].T)
+            eigenvalues = (S[:k] ** 2) / n_total
+            total_variance = float(total_ss / n_total)
+            mean_vector = mean_total
+            n_samples_seen = n_total
+
+        return U_k, mean_vector, eigenvalues, total_variance, n_samples_seen
+
+    @staticmethod
+    def reproject(features: np.ndarray, U_old: np.ndarray, mean_old: np.ndarray,
+                  U_new: np.ndarray, mean_new: np.ndarray) -> np.ndarray:
+        """Map projections from an old basis into a new one without the original pixels.
+
+        z' = (mean_old + z U_old' - mean_new) U_new, which only costs O(N*k^2).
+        """
+        rotation = np.dot(U_old.T, U_new)
+        offset = np.dot(mean_old - mean_new, U_new)
+        return np.dot(features, rotation) + offset
@@ -0,0 +1,60 @@
+from typing import Dict, List, Tuple
+import cv2
+import numpy as np
+
+
+def dhash_rows(X: np.ndarray, target_size: Tuple[int, int], chunk_size: int = 16384) -> np.ndarray:
+    """64-bit difference hashes of preprocessed pixel rows (N x W*H) as uint64.
+
+    Each image is area-resized to 9x8 and every bit records whether a pixel is
+    brighter than its right-hand neighbour. Images are stacked vertically so one
+    resize call hashes a whole chunk; the vertical factor H/8 is integral for the
+    default 64x64 size, so no pixels blend across images.
+    """
+    width, height = target_size
+    weights = (1 << np.arange(64, dtype=np.uint64)).astype(np.uint64)
+    hashes = np.empty(X.shape[0], dtype=np.uint64)
+
+    if height % 8:
+        chunk_size = 1  # stacking would blend neighbouring images
+
+    for start in range(0, X.shape[0], chunk_size):
+        chunk = np.asarray(X[start:start + chunk_size], dtype=np.float32)
+        n_images = chunk.shape[0]
+        stacked = chunk.reshape(n_images * height, width)
+        small = cv2.resize(stacked, (9, n_images * 8), interpolation=cv2.INTER_AREA).reshape(n_images, 8, 9)
+        bits = (small[:, :, 1:] > small[:, :, :-1]).reshape(n_images, 64).astype(np.uint64)
+        hashes[start:start + n_images] = (bits * weights).sum(axis=1, dtype=np.uint64)
+    return hashes
+
+
+class PerceptualHashIndex:
+    """Hash table of dataset dHashes for exact and near-duplicate lookups"""
+
+    def __init__(self, hashes: np.ndarray):
+        self.hashes = np.asarray(hashes, dtype=np.uint64)
+        self._buckets = None
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    @property
+    def buckets(self) -> Dict[int, List[int]]:
+        if self._buckets is None:
+            buckets = {}
+            for row, value in enumerate(self.hashes.tolist()):
+                buckets.setdefault(value, []).append(row)
+            self._buckets = buckets
+        return self._buckets
+
+    def append(self, hashes: np.ndarray) -> "PerceptualHashIndex":
+        return PerceptualHashIndex(np.concatenate([self.hashes, np.asarray(hashes, dtype=np.uint64)]))
+
+    def lookup(self, value: int, radius: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows whose hash is within radius bits of value, with their Hamming distances"""
+        if radius <= 0:
+            rows = np.array(self.buckets.get(int(value), []), dtype=np.intp)
+            return rows, np.zeros(len(rows), dtype=np.intp)
+        distances = np.bitwise_count(np.bitwise_xor(self.hashes, np.uint64(value)))
+        rows = np.flatnonzero(distances <= radius)
+        return rows, distances[rows].astype(np.intp)
@@ -0,0 +1,84 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import FrozenSet, List, Tuple
+import numpy as np
+
+
+class PixelCache:
+    """On-disk cache of preprocessed pixel rows keyed by image content hash.
+
+    <cache_dir>/<W>x<H>-<mode>/
+        index.json         content hash -> [shard, row]
+        shard-<n>.npy      uint8 (rows x W*H), read with np.load(mmap_mode='r')
+
+    Every preprocessing setting lives in the directory name, so a change of
+    target size or preprocess mode starts a fresh cache. Rows are appended as new
+    shards and the index is replaced atomically, so readers never see a row that
+    has not been fully written.
+    """
+
+    INDEX = "index.json"
+
+    def __init__(self, cache_dir, target_size: Tuple[int, int], mode: str):
+        self.settings = (tuple(target_size), mode)
+        self.cache_dir = Path(cache_dir) / f"{target_size[0]}x{target_size[1]}-{mode}"
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.index = {}
+        self.shards = {}
+        index_path = self.cache_dir / self.INDEX
+        if index_path.exists():
+            with open(index_path, 'r') as f:
+                self.index = json.load(f)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def keys(self) -> FrozenSet[str]:
+        """Content hashes that have a cached row"""
+        return frozenset(self.index)
+
+    def contains(self, keys: List[str]) -> np.ndarray:
+        """Mask of the keys that have a cached row"""
+        return np.array([key in self.index for key in keys], dtype=bool)
+
+    def shard(self, shard_id: int) -> np.ndarray:
+        if shard_id not in self.shards:
+            self.shards[shard_id] = np.load(self.cache_dir / f"shard-{shard_id:05d}.npy", mmap_mode='r')
+        return self.shards[shard_id]
+
+    def read(self, keys: List[str]) -> np.ndarray:
+        """Cached rows for keys as float32 (len(keys) x W*H); every key must be cached"""
+        width, height = self.settings[0]
+        X = np.empty((len(keys), width * height), dtype=np.float32)
+        locations = np.array([self.index[key] for key in keys], dtype=np.int64).reshape(-1, 2)
+        # Gather shard by shard so each memmap is read with one fancy index
+        for shard_id in np.unique(locations[:, 0]):
+            positions = np.flatnonzero(locations[:, 0] == shard_id)
+            X[positions] = self.shard(int(shard_id))[locations[positions, 1]]
+        return X
+
+    def add(self, keys: List[str], X: np.ndarray) -> None:
+        """Store rows of X under keys, skipping keys already cached"""
+        with self.lock:
+            fresh = {}
+            for row, key in enumerate(keys):
+                if key not in self.index and key not in fresh:
+                    fresh[key] = row
+            if not fresh:
+                return
+
+            shard_id = 1 + max((location[0] for location in self.index.values()), default=-1)
+            rows = np.fromiter(fresh.values(), dtype=np.intp, count=len(fresh))
+            np.save(self.cache_dir / f"shard-{shard_id:05d}.npy", np.asarray(X[rows]).astype(np.uint8), allow_pickle=False)
+
+            index = dict(self.index)
+            for position, key in enumerate(fresh):
+                index[key] = [shard_id, position]
+            tmp_path = self.cache_dir / f"{self.INDEX}.tmp-{os.getpid()}"
+            with open(tmp_path, 'w') as f:
+                json.dump(index, f)
+            os.replace(tmp_path, self.cache_dir / self.INDEX)
+            self.index = index
@@ -0,0 +1,71 @@
+import hashlib
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Hashable
+
+
+class QueryCache:
+    """Bounded LRU cache with per-entry TTL and hit/miss counters per key kind.
+
+    Keys are tuples of a kind ("result", "projection", ...) followed by a content
+    hash of the uploaded bytes and whatever else the cached value depends on
+    (index version, threshold, paging). Hits and misses are counted per kind,
+    since one query looks up several kinds and their rates mean different things.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = Counter()
+        self.misses = Counter()
+        self.evictions = 0
+
+    @staticmethod
+    def content_hash(contents: bytes) -> str:
+        return hashlib.sha256(contents).hexdigest()
+
+    def get(self, key: Hashable) -> Any:
+        """Cached value for key, or None on a miss or expired entry"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl:
+                del self.entries[key]
+                self.evictions += 1
+                entry = None
+            if entry is None:
+                self.misses[key[0]] += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits[key[0]] += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        with self.lock:
+            self.entries[key] = (time.monotonic(), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self) -> Dict:
+        with self.lock:
+            kinds = {}
+            for kind in sorted(self.hits.keys() | self.misses.keys()):
+                hits, misses = self.hits[kind], self.misses[kind]
+                kinds[kind] = {'hits': hits, 'misses': misses, 'hit_rate': hits / (hits + misses)}
+            return {
+                'entries': len(self.entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'evictions': self.evictions,
+                'lookups': kinds,
+            }
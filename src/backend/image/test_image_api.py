@@ -73,7 +73,7 @@ def format_results(results: dict) -> None:
     all_sim_table.add_column("Similarity", style="red", justify="right")
     
     # Add all similarities
-    for idx, sim in enumerate(results['all_similarities'], 1):
+    for idx, sim in enumerate(results.get('all_similarities', []), 1):
         all_sim_table.add_row(
             str(idx),
             sim['song'],
@@ -0,0 +1,164 @@
+import sys
+import tempfile
+from pathlib import Path
+import numpy as np
+from rich.console import Console
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from image.AnnIndex import IVFIndex
+from image.FeatureStore import FeatureStore
+from image.ImageSimilarity import ImageProcessor
+from image.PCAEngine import PCAEngine
+
+console = Console()
+
+TARGET_SIZE = (8, 8)
+
+
+def synthetic_pixels(n_samples: int, rank: int, noise: float = 0.0, seed: int = 0) -> np.ndarray:
+    """Pixel rows (N x 64) in [0, 255] spanned by rank directions with decaying
+    spread, plus optional isotropic noise"""
+    rng = np.random.default_rng(seed)
+    n_features = TARGET_SIZE[0] * TARGET_SIZE[1]
+    basis = np.linalg.qr(rng.standard_normal((n_features, rank)))[0]
+    scales = 40.0 / np.arange(1, rank + 1)
+    X = 128 + (rng.standard_normal((n_samples, rank)) * scales) @ basis.T
+    X += noise * rng.standard_normal((n_samples, n_features))
+    return X.astype(np.float32)
+
+
+def synthetic_metadata(n_samples: int):
+    return [
+        {"path": f"img{i}.png", "song": f"song{i}", "singer": "-", "genre": "-", "album": f"img{i}.png", "audio": "-"}
+        for i in range(n_samples)
+    ]
+
+
+def fitted_processor(X: np.ndarray, temp_dir: str, **kwargs) -> ImageProcessor:
+    processor = ImageProcessor(str(Path(temp_dir) / "temp_extracted"), target_size=TARGET_SIZE,
+                               n_components=10, **kwargs)
+    processor.fit_arrays(X, synthetic_metadata(len(X)))
+    return processor
+
+
+def test_pca_methods_agree():
+    """Every solver finds the same leading components and projections"""
+    X = synthetic_pixels(300, rank=6, noise=0.5)
+    engine = PCAEngine()
+    U_ref, mean_ref, eig_ref, total_ref, _ = engine.fit(X, 4, method="svd")
+    Z_ref = (X - mean_ref) @ U_ref
+    for method in ("covariance", "gram", "randomized"):
+        U_k, mean_vector, eigenvalues, total_variance, _ = engine.fit(X, 4, method=method)
+        np.testing.assert_allclose(mean_vector, mean_ref, atol=1e-6)
+        np.testing.assert_allclose(eigenvalues, eig_ref, rtol=1e-6)
+        np.testing.assert_allclose(total_variance, total_ref, rtol=1e-9)
+        np.testing.assert_allclose((X - mean_vector) @ U_k, Z_ref, atol=1e-4, err_msg=method)
+
+
+def test_incremental_update_matches_refit():
+    """Folding a batch into a fit equals refitting on all rows when k covers the data's rank"""
+    X = synthetic_pixels(400, rank=5)
+    engine = PCAEngine()
+    U_old, mean_old, eig_old, total_old, _ = engine.fit(X[:250], 5)
+    U_k, mean_vector, eigenvalues, total_variance, n_seen = engine.update(
+        U_old, mean_old, eig_old, total_old, 250, X[250:], batch_size=64
+    )
+    U_ref, mean_ref, eig_ref, total_ref, _ = engine.fit(X, 5)
+
+    assert n_seen == len(X)
+    np.testing.assert_allclose(mean_vector, mean_ref, atol=1e-6)
+    np.testing.assert_allclose(eigenvalues, eig_ref, rtol=1e-6)
+    np.testing.assert_allclose(total_variance, total_ref, rtol=1e-6)
+    # Existing projections rotated into the new basis match projecting from scratch
+    existing = engine.reproject((X[:250] - mean_old) @ U_old, U_old, mean_old, U_k, mean_vector)
+    np.testing.assert_allclose(existing, (X[:250] - mean_ref) @ U_ref, atol=1e-3)
+
+
+def test_save_load_round_trip():
+    """A saved index reopens memory-mapped with identical arrays, settings and results"""
+    X = synthetic_pixels(120, rank=8, noise=1.0)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        processor = fitted_processor(X, temp_dir, feature_dtype="int8", ann="ivf", ann_lists=8)
+        index_dir = Path(temp_dir) / "index"
+        processor.save_index(index_dir)
+        processor.save_index(index_dir)
+
+        reopened = ImageProcessor(str(Path(temp_dir) / "temp_extracted"), target_size=TARGET_SIZE,
+                                  feature_dtype="float64", ann="ivf", clean_temp=False)
+        assert reopened.load_index(index_dir)
+        saved, loaded = processor.index, reopened.index
+        assert loaded.feature_dtype == "int8"
+        assert loaded.image_metadata == saved.image_metadata
+        np.testing.assert_array_equal(loaded.U_k, saved.U_k)
+        np.testing.assert_array_equal(loaded.feature_store.data, saved.feature_store.data)
+        np.testing.assert_array_equal(loaded.phash_index.hashes, saved.phash_index.hashes)
+        np.testing.assert_array_equal(loaded.ann_index.centroids, saved.ann_index.centroids)
+
+        query = processor.project_query(X[7])
+        expected = processor.search_similar_images(query, top_k=10, exact=True)
+        actual = reopened.search_similar_images(query, top_k=10, exact=True)
+        assert actual['matching_results'] == expected['matching_results']
+
+
+def test_pagination_without_overlap():
+    """Pages of a ranking with many tied percentages partition the full ranking"""
+    X = synthetic_pixels(60, rank=6, noise=1.0)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        processor = fitted_processor(X, temp_dir)
+        rng = np.random.default_rng(1)
+        similarities = rng.choice([55.0, 60.0, 60.004, 72.5, 90.0], size=len(X))
+
+        full = processor.rank_similarities(similarities, 60)['matching_results']
+        paged = []
+        for offset in range(0, len(full) + 7, 7):
+            page = processor.rank_similarities(similarities, 60, offset=offset, limit=7)
+            assert page['matches_found'] == len(full)
+            paged.extend(page['matching_results'])
+
+    assert [r['song'] for r in paged] == [r['song'] for r in full]
+    assert len({r['song'] for r in paged}) == len(paged)
+    assert len(full) == int(np.count_nonzero(np.round(similarities, 2) >= 60))
+
+
+def test_ivf_recall():
+    """The IVF index finds most exact neighbours probing one list and all of them when probing every list"""
+    rng = np.random.default_rng(2)
+    centers = rng.standard_normal((16, 10)) * 10
+    features = centers[rng.integers(0, 16, 2000)] + rng.standard_normal((2000, 10))
+    queries = centers[rng.integers(0, 16, 50)] + rng.standard_normal((50, 10))
+    index = IVFIndex(n_lists=16).build(features)
+
+    def recall(nprobe):
+        hits = 0
+        for query in queries:
+            exact = np.argsort(np.sum((features - query) ** 2, axis=1))[:10]
+            candidates, _ = index.search(query, nprobe)
+            approximate = candidates[np.argsort(np.sum((features[candidates] - query) ** 2, axis=1))[:10]]
+            hits += len(np.intersect1d(exact, approximate))
+        return hits / (10 * len(queries))
+
+    assert recall(16) == 1.0
+    assert recall(1) >= 0.9
+
+
+def test_quantization_error():
+    """Stored features stay within the error bound of each dtype"""
+    rng = np.random.default_rng(3)
+    features = rng.standard_normal((500, 12)) * np.linspace(50, 1, 12)
+    for dtype, tolerance in (("float64", 0), ("float32", 1e-6), ("float16", 1e-3)):
+        decoded = FeatureStore(dtype).encode(features).decode()
+        assert np.all(np.abs(decoded - features) <= tolerance * np.abs(features) + 1e-12), dtype
+
+    store = FeatureStore("int8").encode(features)
+    # Symmetric per-dimension quantization rounds to the nearest code, so the error is at most half a step
+    assert np.all(np.abs(store.decode() - features) <= store.scale / 2 + 1e-4)
+    exact = np.sum((features[:5, None, :] - features[None, :, :]) ** 2, axis=2)
+    np.testing.assert_allclose(store.squared_distances(features[:5]), exact, rtol=0.05, atol=1.0)
+
+
+if __name__ == "__main__":
+    for test in (test_pca_methods_agree, test_incremental_update_matches_refit, test_save_load_round_trip,
+                 test_pagination_without_overlap, test_ivf_recall, test_quantization_error):
+        test()
+        console.print(f"[bold cyan]{test.__name__} passed")
@@ -1,12 +1,11 @@
 # main.py
 from tokenize import String
 import os
-from fastapi import FastAPI, UploadFile, File, Form
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, UploadFile, File, Form, Request
+from fastapi.responses import FileResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import numpy as np
-import cv2
 from typing import List, Dict, Tuple
 import json
 import zipfile
@@ -17,8 +16,14 @@ from rich.console import Console
 from rich.table import Table
 from rich import print as rprint
 from fastapi.exceptions import HTTPException
-from audio.AudioSimilarity import AudioProcessor
+from audio.AudioSimilarity import AudioProcessor, timed_midi_bytes_features
 from image.ImageSimilarity import ImageProcessor
+from image.IndexStore import ImageIndexStore
+from image.Ingest import timed_decode_pixels
+from Uploads import UploadRejected, UploadSpooler
+from Jobs import JobManager
+from Executor import ExecutorSaturated, SearchExecutor
+from StageTimer import StageTimer
 
 # Initialize Rich console
 console = Console()
@@ -39,12 +44,91 @@ if not os.path.exists(temp_extracted_path):
 
 print(f"'temp_extracted' created at: {temp_extracted_path}")
 
+# Fitted image index is persisted here and reopened (memory-mapped) on startup
+image_index_path = os.environ.get(
+    "IMAGE_INDEX_DIR",
+    os.path.join(os.path.dirname(current_file_path), 'index_store', 'image')
+)
+
+# Preprocessed pixel rows are cached here so refits skip decoding; set to "off" to disable
+image_pixel_cache_path = os.environ.get(
+    "IMAGE_PIXEL_CACHE_DIR",
+    os.path.join(os.path.dirname(current_file_path), 'index_store', 'pixels')
+)
+
+# Dataset uploads are streamed to temp files here and checked before extraction;
+# UPLOAD_MAX_BYTES bounds the request body and is enforced while it arrives
+uploadSpooler = UploadSpooler(
+    os.environ.get("UPLOAD_DIR", os.path.join(os.path.dirname(current_file_path), 'uploads')),
+    max_bytes=int(os.environ.get("UPLOAD_MAX_BYTES", 4 << 30)),
+    max_members=int(os.environ.get("UPLOAD_MAX_MEMBERS", 100000)),
+    max_uncompressed_bytes=int(os.environ.get("UPLOAD_MAX_UNCOMPRESSED_BYTES", 16 << 30))
+)
+
+# Dataset ingest runs in background jobs, one worker per processor
+jobManager = JobManager()
+
+# Searches run on this pool; beyond workers + queue depth requests get a 503
+# SEARCH_EXECUTOR=process decodes /search-image-batch queries and parses /search-audio queries
+# in worker processes; /search-image decodes on the thread pool, after its cache lookup
+searchExecutor = SearchExecutor(
+    os.environ.get("SEARCH_EXECUTOR", "thread"),
+    max_workers=int(os.environ.get("SEARCH_WORKERS", 0)) or None,
+    max_queue=int(os.environ.get("SEARCH_QUEUE_DEPTH", 64))
+)
+
+# Search logging: INFO adds one structured event per query, DEBUG also renders result tables;
+# SEARCH_LOG_SAMPLE keeps that fraction of per-query events
+search_log_level = os.environ.get("SEARCH_LOG_LEVEL", "WARNING")
+search_log_sample_rate = float(os.environ.get("SEARCH_LOG_SAMPLE", 1.0))
+
+# Keep extracted files when a saved index refers to them
+warm_start = ImageIndexStore(image_index_path).exists()
+
 
 # FastAPI application setup
-imageProcessor = ImageProcessor(temp_extracted_path)
-audioProcessor = AudioProcessor(temp_extracted_path)
+imageProcessor = ImageProcessor(
+    temp_extracted_path,
+    clean_temp=not warm_start,
+    # "stream" decodes images straight out of the uploaded zip, "extract" unpacks it first
+    ingest_mode=os.environ.get("IMAGE_INGEST_MODE", "stream"),
+    # Set IMAGE_ANN=ivf to serve queries from an approximate index; exact search otherwise
+    ann=os.environ.get("IMAGE_ANN") or None,
+    ann_nprobe=int(os.environ.get("IMAGE_ANN_NPROBE", 8)),
+    # Stored projection precision: float64, float32, float16 or int8
+    feature_dtype=os.environ.get("IMAGE_FEATURE_DTYPE", "float32"),
+    cache_entries=int(os.environ.get("IMAGE_CACHE_ENTRIES", 1024)),
+    cache_ttl=float(os.environ.get("IMAGE_CACHE_TTL", 600)),
+    # "fast" decodes straight to reduced-size grayscale; used for both ingest and queries
+    preprocess_mode=os.environ.get("IMAGE_PREPROCESS_MODE", "fast"),
+    # Hamming radius for the duplicate-cover prefilter, used for top_k queries it can fill; "off" disables
+    phash_radius=None if os.environ.get("IMAGE_PHASH_RADIUS", "4") == "off" else int(os.environ.get("IMAGE_PHASH_RADIUS", 4)),
+    pixel_cache_dir=None if image_pixel_cache_path == "off" else image_pixel_cache_path,
+    log_level=search_log_level,
+    log_sample_rate=search_log_sample_rate
+)
+audioProcessor = AudioProcessor(
+    temp_extracted_path,
+    cleanTemp=not warm_start,
+    # MIDI files are parsed on this many processes during ingest (default: all cores)
+    numWorkers=int(os.environ.get("AUDIO_INGEST_WORKERS", 0)) or None,
+    logLevel=search_log_level,
+    logSampleRate=search_log_sample_rate
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pages are faulted in on first use and shared between workers
+    try:
+        if imageProcessor.load_index(image_index_path, mmap=True):
+            print(f"Image index reopened from: {image_index_path}")
+    except Exception as e:
+        print(f"Could not reopen image index at {image_index_path}: {e}")
+    yield
+    jobManager.shutdown()
+    searchExecutor.shutdown()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -64,95 +148,182 @@ from pathlib import Path
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+def ingest_image_dataset(archive, mapper, variance_target, max_bytes_per_image, progress):
+    """Job body: build and persist a new image index from a spooled upload"""
+    try:
+        # Update DatasetLoader to use this specific zip
+        logger.info("Loading dataset...")
+        imageProcessor.dataset_loader.test_dir = uploadSpooler.upload_dir
+        pca_summary = imageProcessor.load_dataset(
+            archive.name, mapper.name if mapper else None, variance_target, max_bytes_per_image, progress
+        )
+        progress("save", 0.0)
+        imageProcessor.save_index(image_index_path)
+    finally:
+        logger.info(f"Deleting temporary upload {archive.path}...")
+        archive.unlink()
+        if mapper:
+            mapper.unlink()
+
+    logger.info("Dataset loaded successfully.")
+    return {
+        "status": "Dataset loaded successfully",
+        "upload": archive.summary(),
+        "index": imageProcessor.index_stats(),
+        "pca": pca_summary,
+        "stages": imageProcessor.load_stages
+    }
+
+def append_image_dataset(archive, mapper, refit_threshold, progress):
+    """Job body: append a spooled upload to the image index and persist it"""
+    try:
+        logger.info("Appending to dataset...")
+        imageProcessor.dataset_loader.test_dir = uploadSpooler.upload_dir
+        summary = imageProcessor.add_images(archive.name, mapper.name if mapper else None, refit_threshold, progress)
+        progress("save", 0.0)
+        imageProcessor.save_index(image_index_path)
+    finally:
+        logger.info(f"Deleting temporary upload {archive.path}...")
+        archive.unlink()
+        if mapper:
+            mapper.unlink()
+
+    logger.info(f"Dataset appended: {summary}")
+    return {
+        "status": "Dataset appended successfully",
+        **summary,
+        "upload": archive.summary(),
+        "index": imageProcessor.index_stats()
+    }
+
+def ingest_audio_dataset(archive, mapper, progress):
+    """Job body: rebuild the audio dataset from a spooled upload"""
+    try:
+        # Update DatasetLoader to use this specific zip
+        logger.info("Loading dataset...")
+        audioProcessor.dataset_loader.test_dir = uploadSpooler.upload_dir
+        audioProcessor.load_dataset(archive.name, mapper.name if mapper else None, progress)
+    finally:
+        logger.info(f"Deleting temporary upload {archive.path}...")
+        archive.unlink()
+        if mapper:
+            mapper.unlink()
+
+    logger.info("Dataset loaded successfully.")
+    return {
+        "status": "Dataset loaded successfully",
+        "upload": archive.summary(),
+        "songs": len(audioProcessor.audioMetadata),
+        "failed": audioProcessor.loadErrors,
+        "stages": audioProcessor.loadStages
+    }
+
+def timed_response(results: dict, timer: StageTimer) -> JSONResponse:
+    """Merge the processor's stage times into the endpoint's and return the response.
+
+    processing_metrics.stages lists every stage up to ranking; serialization can
+    only be measured once the body is rendered, so it is reported in the
+    Server-Timing header alongside the rest.
+    """
+    metrics = results.setdefault('processing_metrics', {})
+    for name, seconds in metrics.get('stages', {}).items():
+        timer.add(name, seconds)
+    metrics['stages'] = timer.as_dict()
+    with timer.stage("serialization"):
+        response = JSONResponse(content=results)
+    response.headers["Server-Timing"] = timer.server_timing()
+    return response
+
 @app.post("/upload-image-dataset")
-async def upload_dataset(file: UploadFile = File(...), mapper_file: UploadFile = File(None)):
-    # console.print(mapper_file.filename)
-    if not file:
-        raise HTTPException(status_code=400, detail="Both mapper_file and file are required")
+async def upload_dataset(
+    request: Request,
+    variance_target: float = None,
+    max_bytes_per_image: float = None
+):
+    # Multipart fields: file (dataset zip) and optional mapper_file, streamed by uploadSpooler
     try:
-        if mapper_file:
-            logger.info(f"Received mapper file: {mapper_file.filename}")
-        logger.info(f"Received dataset file: {file.filename}")
+        if variance_target is not None and not 0 < variance_target <= 100:
+            return JSONResponse(status_code=400, content={"error": "Invalid variance target"})
+        if max_bytes_per_image is not None and max_bytes_per_image <= 0:
+            return JSONResponse(status_code=400, content={"error": "Invalid memory budget"})
+
         logger.info("Starting dataset upload...")
         
         # Cleanup any existing dataset
         # logger.info("Cleaning up existing dataset...")
         # imageProcessor.cleanup()
 
-        # Save uploaded zip file
-        zip_path = f"temp_{time.time()}.zip"
-        logger.info(f"Saving file to {zip_path}...")
-        with open(zip_path, 'wb') as buffer:
-            buffer.write(await file.read())
-
-        mapper_path = None
-        if mapper_file:
-            # Save mapper file
-            mapper_path = f"temp_{mapper_file.filename}"
-            logger.info(f"Saving file to {mapper_path}...")
-            with open(mapper_path, 'wb') as buffer:
-                buffer.write(await mapper_file.read())
-        
-        # Update DatasetLoader to use this specific zip
-        logger.info("Loading dataset...")
-        imageProcessor.dataset_loader.test_dir = Path(zip_path).parent
-        imageProcessor.load_dataset(zip_path, mapper_path)
-
-        # Optional: Remove the temporary zip file after processing
-        logger.info(f"Deleting temporary zip file {zip_path}...")
-        Path(zip_path).unlink(missing_ok=True)
+        # Stream the zip and mapper to disk
+        archive, mapper = await uploadSpooler.save_dataset(request)
+        if mapper:
+            logger.info(f"Received mapper file: {mapper.filename}")
+        logger.info(f"Saved {archive.filename} ({archive.size} bytes, {archive.members} files) to {archive.path}")
 
-        logger.info("Dataset loaded successfully.")
-        return {"status": "Dataset loaded successfully"}
+        job = jobManager.submit(
+            "image", "image-upload", ["extract", "preprocess", "pca", "projection", "index", "save"],
+            ingest_image_dataset, archive, mapper, variance_target, max_bytes_per_image
+        )
+        logger.info(f"Queued image dataset job {job.id}")
+        return JSONResponse(status_code=202, content={"status": "Dataset upload accepted", "job": job.to_dict()})
 
+    except UploadRejected as e:
+        return JSONResponse(status_code=e.status_code, content={"error": str(e)})
     except Exception as e:
         logger.error(f"Error during dataset upload: {e}")
         return JSONResponse(status_code=500, content={"error": str(e)})
 
+@app.post("/append-image-dataset")
+async def append_dataset(
+    request: Request,
+    refit_threshold: float = None
+):
+    # Multipart fields: file (dataset zip) and optional mapper_file, streamed by uploadSpooler
+    try:
+        if refit_threshold is not None and refit_threshold < 0:
+            return JSONResponse(status_code=400, content={"error": "Invalid refit threshold"})
+
+        # Stream the zip and mapper to disk
+        archive, mapper = await uploadSpooler.save_dataset(request)
+        if mapper:
+            logger.info(f"Received mapper file: {mapper.filename}")
+        logger.info(f"Saved {archive.filename} ({archive.size} bytes, {archive.members} files) to {archive.path}")
+
+        job = jobManager.submit(
+            "image", "image-append", ["extract", "preprocess", "pca", "projection", "index", "save"],
+            append_image_dataset, archive, mapper, refit_threshold
+        )
+        logger.info(f"Queued image append job {job.id}")
+        return JSONResponse(status_code=202, content={"status": "Dataset append accepted", "job": job.to_dict()})
+
+    except UploadRejected as e:
+        return JSONResponse(status_code=e.status_code, content={"error": str(e)})
+    except Exception as e:
+        logger.error(f"Error during dataset append: {e}")
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
 @app.post("/upload-audio-dataset")
-async def upload_dataset(file: UploadFile = File(...), mapper_file: UploadFile = File(None)):
+async def upload_dataset(request: Request):
     console.print("anjay")
-    # console.print(mapper_file.filename)
-    # return {"file": file.filename, "mapper_file": mapper_file.filename if mapper_file else None}
-
-    if not file:
-        raise HTTPException(status_code=400, detail="Both mapper_file and file are required")
+    # Multipart fields: file (dataset zip) and optional mapper_file, streamed by uploadSpooler
     try:
-        if mapper_file:
-            logger.info(f"Received mapper file: {mapper_file.filename}")
-        logger.info(f"Received dataset file: {file.filename}")
         logger.info("Starting dataset upload...")
         
         # Cleanup any existing dataset
         # logger.info("Cleaning up existing dataset...")
         # audioProcessor.cleanup()
 
-        # Save uploaded zip file
-        zip_path = f"temp_{time.time()}.zip"
-        logger.info(f"Saving file to {zip_path}...")
-        with open(zip_path, 'wb') as buffer:
-            buffer.write(await file.read())
-
-        # Save mapper file
-        mapper_path = None
-        if mapper_file:
-            mapper_path = f"temp_{mapper_file.filename}"
-            logger.info(f"Saving file to {mapper_path}...")
-            with open(mapper_path, 'wb') as buffer:
-                buffer.write(await mapper_file.read())
-        
-        # Update DatasetLoader to use this specific zip
-        logger.info("Loading dataset...")
-        audioProcessor.dataset_loader.test_dir = Path(zip_path).parent
-        audioProcessor.load_dataset(zip_path, mapper_path)
-
-        # Optional: Remove the temporary zip file after processing
-        logger.info(f"Deleting temporary zip file {zip_path}...")
-        Path(zip_path).unlink(missing_ok=True)
+        # Stream the zip and mapper to disk
+        archive, mapper = await uploadSpooler.save_dataset(request)
+        if mapper:
+            logger.info(f"Received mapper file: {mapper.filename}")
+        logger.info(f"Saved {archive.filename} ({archive.size} bytes, {archive.members} files) to {archive.path}")
 
-        logger.info("Dataset loaded successfully.")
-        return {"status": "Dataset loaded successfully"}
+        job = jobManager.submit("audio", "audio-upload", ["extract", "parse"], ingest_audio_dataset, archive, mapper)
+        logger.info(f"Queued audio dataset job {job.id}")
+        return JSONResponse(status_code=202, content={"status": "Dataset upload accepted", "job": job.to_dict()})
 
+    except UploadRejected as e:
+        return JSONResponse(status_code=e.status_code, content={"error": str(e)})
     except Exception as e:
         logger.error(f"Error during dataset upload: {e}")
         return JSONResponse(status_code=500, content={"error": str(e)})
@@ -160,62 +331,185 @@ async def upload_dataset(file: UploadFile = File(...), mapper_file: UploadFile =
 @app.post("/search-image")
 async def search_similar_images(
     file: UploadFile = File(...),
-    similarity_threshold: float = 60.0
+    similarity_threshold: float = 60.0,
+    top_k: int = None,
+    offset: int = 0,
+    limit: int = None,
+    include_all: bool = False,
+    exact: bool = False,
+    nprobe: int = None
 ):
-    if imageProcessor.dataset_features is None:
+    if imageProcessor.feature_store is None:
         return JSONResponse(status_code=400, content={"error": "Dataset not loaded. Please upload a dataset first."})
     
     try:
         if not 0 <= similarity_threshold <= 100:
             return JSONResponse(status_code=400, content={"error": "Invalid threshold"})
+
+        if offset < 0 or (limit is not None and limit < 0) or (top_k is not None and top_k < 0):
+            return JSONResponse(status_code=400, content={"error": "Invalid pagination parameters"})
+
+        if nprobe is not None and nprobe < 1:
+            return JSONResponse(status_code=400, content={"error": "Invalid nprobe"})
         
         allowed_types = {"image/jpeg", "image/png"}
         if file.content_type not in allowed_types:
             return JSONResponse(status_code=400, content={"error": "Unsupported file type"})
         
-        contents = await file.read()
-        nparr = np.frombuffer(contents, np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        if image is None:
-            return JSONResponse(status_code=400, content={"error": "Invalid image file"})
-        
-        imageProcessor.similarity_threshold = similarity_threshold
-        query_features = imageProcessor.process_query_image(image)
-        results = imageProcessor.search_similar_images(query_features)
+        timer = StageTimer()
+        async with searchExecutor.admit():
+            with timer.stage("upload_read"):
+                contents = await file.read()
+            
+            try:
+                results = await searchExecutor.run(
+                    imageProcessor.search_image_bytes, contents, top_k, offset, limit, include_all, exact, nprobe,
+                    similarity_threshold
+                )
+            except ValueError as e:
+                return JSONResponse(status_code=400, content={"error": str(e)})
         
-        return results
+        return timed_response(results, timer)
         
+    except ExecutorSaturated as e:
+        return JSONResponse(status_code=503, content={"error": str(e)}, headers={"Retry-After": "1"})
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+@app.post("/search-image-batch")
+async def search_similar_images_batch(
+    files: List[UploadFile] = File(...),
+    similarity_threshold: float = 60.0,
+    top_k: int = None,
+    offset: int = 0,
+    limit: int = None
+):
+    if imageProcessor.feature_store is None:
+        return JSONResponse(status_code=400, content={"error": "Dataset not loaded. Please upload a dataset first."})
+
+    try:
+        if not 0 <= similarity_threshold <= 100:
+            return JSONResponse(status_code=400, content={"error": "Invalid threshold"})
+
+        if offset < 0 or (limit is not None and limit < 0) or (top_k is not None and top_k < 0):
+            return JSONResponse(status_code=400, content={"error": "Invalid pagination parameters"})
+
+        allowed_types = {"image/jpeg", "image/png"}
+        # Every query in the batch is answered from the same index snapshot
+        index = imageProcessor.current_index()
+        start_time = time.time()
+        timer = StageTimer()
+        async with searchExecutor.admit():
+            images = []
+            errors = {}
+            for idx, file in enumerate(files):
+                if file.content_type not in allowed_types:
+                    errors[idx] = "Unsupported file type"
+                    continue
+                with timer.stage("upload_read"):
+                    contents = await file.read()
+                processed, extract_stages = await searchExecutor.extract(
+                    timed_decode_pixels, contents, imageProcessor.target_size, index.preprocess_mode
+                )
+                for name, seconds in extract_stages.items():
+                    timer.add(name, seconds)
+                if processed is None:
+                    errors[idx] = "Invalid image file"
+                    continue
+                images.append((idx, processed))
+
+            batch_results = []
+            if images:
+                with timer.stage("projection"):
+                    query_features = await searchExecutor.run(
+                        imageProcessor.project_queries, np.stack([processed for _, processed in images]), index
+                    )
+                batch_results = await searchExecutor.run(
+                    imageProcessor.search_similar_images_batch, query_features, top_k, offset, limit,
+                    similarity_threshold, index, timer
+                )
+
+        results = [None] * len(files)
+        for (idx, _), result in zip(images, batch_results):
+            results[idx] = {'filename': files[idx].filename, **result}
+        for idx, error in errors.items():
+            results[idx] = {'filename': files[idx].filename, 'error': error}
+
+        return timed_response({
+            'results': results,
+            'processing_metrics': {
+                'processing_time': time.time() - start_time,
+                'load_time': imageProcessor.load_time
+            }
+        }, timer)
+
+    except ExecutorSaturated as e:
+        return JSONResponse(status_code=503, content={"error": str(e)}, headers={"Retry-After": "1"})
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+@app.get("/search-executor-stats")
+async def search_executor_stats():
+    return searchExecutor.stats()
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = jobManager.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Job not found"})
+    return job.to_dict()
+
+@app.get("/image-cache-stats")
+async def image_cache_stats():
+    return {"index_version": imageProcessor.index_version, **imageProcessor.query_cache.stats()}
+
+@app.get("/audio-channel1/{audio:path}")
+async def audio_channel1(audio: str):
+    """Channel-1 export of a dataset song, written on first request"""
+    if audio not in {metadata["audio"] for metadata in audioProcessor.audioMetadata}:
+        return JSONResponse(status_code=404, content={"error": "Song not found"})
+    try:
+        channel1Path = await searchExecutor.run(audioProcessor.dataset_loader.channel1_file, audio)
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
+    return FileResponse(channel1Path, media_type="audio/midi")
 
 @app.post("/search-audio")
 async def search_similar_audio(
     file: UploadFile = File(...),
-    similarityThreshold: float = 60.0
+    similarityThreshold: float = 60.0,
+    topK: int = None
 ):
     """Endpoint to search for similar audio files"""
     try:
         if not 0 <= similarityThreshold <= 100:
             return JSONResponse(status_code=400, content={"error": "Invalid threshold"})
+
+        if topK is not None and topK < 0:
+            return JSONResponse(status_code=400, content={"error": "Invalid topK"})
         
         if not file.filename.lower().endswith(('.mid', '.midi')):
             return JSONResponse(status_code=400, content={"error": "Only MIDI files are supported"})
         
-        # Save uploaded file temporarily
-        tempFile = Path("temp_query.mid")
-        with tempFile.open("wb") as f:
-            f.write(await file.read())
-        
-        try:
-            audioProcessor.similarityThreshold = similarityThreshold
-            queryFeatures = audioProcessor.process_midi_file(str(tempFile))
-            results = audioProcessor.search_similar_audio(queryFeatures)
-            return results
+        timer = StageTimer()
+        async with searchExecutor.admit():
+            with timer.stage("upload_read"):
+                contents = await file.read()
+            # Parse the upload in memory; a shared temp file would race between requests
+            try:
+                queryFeatures, extractStages = await searchExecutor.extract(timed_midi_bytes_features, contents)
+            except ValueError as e:
+                return JSONResponse(status_code=400, content={"error": f"Invalid MIDI file: {e}"})
+            for name, seconds in extractStages.items():
+                timer.add(name, seconds)
             
-        finally:
-            tempFile.unlink()  # Clean up temporary file
+            results = await searchExecutor.run(
+                audioProcessor.search_similar_audio, queryFeatures, similarityThreshold, topK
+            )
+            return timed_response(results, timer)
             
+    except ExecutorSaturated as e:
+        return JSONResponse(status_code=503, content={"error": str(e)}, headers={"Retry-After": "1"})
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
         